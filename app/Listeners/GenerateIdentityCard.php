@@ -37,23 +37,20 @@ public function handle(MediaHasBeenAddedEvent $event)
             Log::info("Identity Card Generation for Employee #{$media->model->id} started ...");
             if ($media->disk != 'local') {
                 $client = new Client();
-                $media_url = $media->getUrl();
-                $file_extension = pathinfo(parse_url($media_url, PHP_URL_PATH), PATHINFO_EXTENSION);
-                $content = $client->get($media_url)->getBody()->getContents();
+                $content = $client->get($media->getUrl())->getBody()->getContents();
             } else {
-                $media_path = $media->getPath();
-                $file_extension = pathinfo($media_path, PATHINFO_EXTENSION);
-                $content = file_get_contents($media_path);
+                $content = file_get_contents($media->getPath());
             }
 
-            $temp_file_name = uniqid('input_photo_') . '.' . $file_extension;
-            Storage::disk('local')->put($temp_file_name, $content);
-            $temp_media_path = Storage::disk('local')->path($temp_file_name);
-
             $identity_card_file_name = uniqid('identity_card_') . '.pdf';
             Storage::disk('local')->put($identity_card_file_name, '');
             $identity_card_file_path = Storage::disk('local')->path($identity_card_file_name);
 
+            // The passport photo is cut out in the same run, so the photo is only processed once
+            $passport_photo_media_file_name = uniqid('passport_photo_') . '.png';
+            Storage::disk('local')->put($passport_photo_media_file_name, '');
+            $passport_photo_media_path = Storage::disk('local')->path($passport_photo_media_file_name);
+
             $command = base_path('tools/id-card-creator/generate_id_card');
             $template_path = base_path('tools/id-card-creator/templates/HyScaler_ID_Card_2023');
             $arguments = [
@@ -61,13 +58,15 @@ public function handle(MediaHasBeenAddedEvent $event)
                 '-n', $media->model->full_name,
                 '-e', $media->model->employee_code,
                 '-b', $media->model->blood_group,
-                '-i', $temp_media_path,
+                '-i', '-',  // The photo is piped on stdin
                 '-r', $media->model->head_to_face_ratio,
                 '-y', $media->model->years_of_experience ?: '0',  // Use '0' if years_of_experience is empty
-                '-o', $identity_card_file_path
+                '-o', $identity_card_file_path,
+                '-p', $passport_photo_media_path
             ];
 
             $process = new Process([$command, ...$arguments]);
+            $process->setInput($content);
 
             // Specify a timeout if needed (null means no timeout)
             $process->setTimeout(null);
@@ -79,12 +78,16 @@ public function handle(MediaHasBeenAddedEvent $event)
                 // Return the output of the command if needed
 
                 $media->model->addMedia($identity_card_file_path)->toMediaCollection('identity_card');
+                $media->model->addMedia($passport_photo_media_path)->toMediaCollection('passport_photo');
 
                 Log::info($process->getOutput());
+                // The last stderr line holds the stage timings of the run
+                Log::info($process->getErrorOutput());
                 Log::info("Identity Card Generated at $identity_card_file_path ...");
-                Log::info("Cleaning temporary files {$temp_file_name} and {$identity_card_file_name}...");
-                Storage::disk('local')->delete($temp_file_name);
+                Log::info("Passport Photo Generated at $passport_photo_media_path ...");
+                Log::info("Cleaning temporary files {$identity_card_file_name} and {$passport_photo_media_file_name}...");
                 Storage::disk('local')->delete($identity_card_file_name);
+                Storage::disk('local')->delete($passport_photo_media_file_name);
                 Log::info("All Done!");
             } catch (ProcessFailedException $exception) {
                 // Handle the error
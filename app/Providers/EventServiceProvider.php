@@ -21,7 +21,7 @@ class EventServiceProvider extends ServiceProvider
             SendEmailVerificationNotification::class,
         ],
         \Spatie\MediaLibrary\MediaCollections\Events\MediaHasBeenAddedEvent::class => [
-            \App\Listeners\GeneratePassportPhoto::class,
+            // Also produces the passport photo, see GeneratePassportPhoto for the standalone listener
             \App\Listeners\GenerateIdentityCard::class
         ],
     ];
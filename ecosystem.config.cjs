@@ -11,5 +11,10 @@ module.exports = {
                 NODE_ENV: "staging", // Environment variables for the 'staging' environment
             },
         },
+        {
+            name: "id-card-worker", // Keeps the photo models loaded between passport photo / identity card jobs
+            script: "tools/id-card-creator/id_card_worker",
+            interpreter: "bash",
+        },
     ],
 };
@@ -31,7 +31,10 @@ import argparse
 import logging
 import tempfile
 import shutil
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple, Callable, Callable
 from dataclasses import dataclass, asdict
@@ -44,8 +47,10 @@ try:
     is_english,
     is_test_file_path,
     is_asset_file_path,
-    has_sufficient_code_changes,
-    has_rust_embedded_tests,
+    scan_patch_lines,
+    parse_numstat_z,
+    numstat_source_changes,
+    RustTestDetector,
     normalize_to_utc,
     HEADERS,
     has_valid_issue_word_count,
@@ -60,8 +65,10 @@ except Exception:
     is_english,
     is_test_file_path,
     is_asset_file_path,
-    has_sufficient_code_changes,
-    has_rust_embedded_tests,
+    scan_patch_lines,
+    parse_numstat_z,
+    numstat_source_changes,
+    RustTestDetector,
     normalize_to_utc,
     HEADERS,
     has_valid_issue_word_count,
@@ -80,6 +87,7 @@ logger = logging.getLogger(__name__)
 MIN_PR_CODE_CHANGES = 1
 MIN_TEST_FILES = 1
 MAX_NON_TEST_FILES = 100
+PR_WORKERS = 8  # PRs validated and diffed concurrently
 
 # Retry configuration
 MAX_RETRIES = 3
@@ -1360,6 +1368,105 @@ class RepoAnalyzer:
         return metrics
 
 
+# Git helpers
+class GitObjectChecker:
+    """
+    Answer object existence queries from a long-lived `git cat-file --batch-check` process.
+
+    Objects found once are remembered, so repeated checks of the same base and head commits
+    never reach git. Missing objects are asked again, since a later fetch may bring them in.
+    Safe to share between threads.
+    """
+
+    def __init__(self, repo_path: Path):
+        self.repo_path = repo_path
+        self._existing = set()
+        self._process = None
+        self._lock = threading.Lock()
+
+    def _start(self) -> subprocess.Popen:
+        return subprocess.Popen(
+            ['git', 'cat-file', '--batch-check'],
+            cwd=self.repo_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            bufsize=1
+        )
+
+    def exists(self, name: str) -> bool:
+        if name in self._existing:
+            return True
+        if not name or '\n' in name:
+            return False
+
+        with self._lock:
+            try:
+                if self._process is None or self._process.poll() is not None:
+                    self._process = self._start()
+                self._process.stdin.write(f"{name}\n")
+                self._process.stdin.flush()
+                answer = self._process.stdout.readline()
+            except OSError as e:
+                logger.debug(f"git cat-file failed: {e}")
+                self._close()
+                return False
+
+        # "<sha> <type> <size>" for objects in the repo, "<name> missing" (or "ambiguous") otherwise
+        parts = answer.split()
+        if len(parts) != 3:
+            return False
+        self._existing.add(name)
+        return True
+
+    def _close(self):
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=10)
+            except Exception:
+                self._process.kill()
+            self._process = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+# Logging helpers
+class DeferredLogs(logging.Filter):
+    """
+    Holds back the records a thread logs while it runs a capture() call.
+
+    The records are returned to the caller, which replays them with logger.handle() in whatever
+    order it needs, e.g. PR order for PRs evaluated concurrently.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        records = getattr(self._local, 'records', None)
+        if records is None:
+            return True
+        records.append(record)
+        return False
+
+    def capture(self, function: Callable, *args) -> Tuple[Any, Optional[Exception], List[logging.LogRecord]]:
+        """Run function, returning its result or the exception it raised, and the records it logged."""
+        self._local.records = records = []
+        try:
+            return function(*args), None, records
+        except Exception as e:
+            return None, e, records
+        finally:
+            self._local.records = None
+
+
 # PR Analyzer
 class PRAnalyzer:
     """Analyze PRs with rejection tracking."""
@@ -1368,6 +1475,7 @@ class PRAnalyzer:
                  repo_path: str,
                  min_test_files: int = MIN_TEST_FILES, max_non_test_files: int = MAX_NON_TEST_FILES,
                  min_code_changes: int = MIN_PR_CODE_CHANGES, start_date: Optional[datetime] = None,
+                 workers: int = PR_WORKERS,
                  ):
         self.platform_client = platform_client
         self.owner = platform_client.owner
@@ -1379,25 +1487,66 @@ class PRAnalyzer:
         self.max_non_test_files = max_non_test_files
         self.min_code_changes = min_code_changes
         self.start_date = start_date
+        self.workers = max(1, workers)
+        self.failed_fetches = []  # PRs whose head ref could not be fetched
+        self._object_checker = GitObjectChecker(self.repo_path)
 
     def _commit_exists(self, sha: str) -> bool:
         """Check if a commit exists in the local repo."""
-        check = subprocess.run(
-            ['git', 'cat-file', '-t', sha],
+        return self._object_checker.exists(sha)
+
+    def _fetch_refspecs(self, refspecs: List[str]) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            ['git', 'fetch', 'origin', *refspecs],
             cwd=self.repo_path,
             capture_output=True,
             text=True,
             encoding='utf-8',
             errors='replace',
-            timeout=10
+            timeout=60 + 5 * len(refspecs)
         )
-        return check.returncode == 0
 
-    def _fetch_pr_ref(self, pr_number: int) -> bool:
-        """Fetch a PR's head ref from origin."""
+    def _prefetch_pr_heads(self, prs: List[dict]) -> List[int]:
+        """
+        Fetch the missing head commits of a batch of PRs with a single git fetch.
+
+        Returns the numbers of the PRs whose head ref could not be fetched.
+        """
+        missing = [pr for pr in prs if not self._commit_exists(pr['headRefOid'])]
+        refspecs = {f"+pull/{pr['number']}/head:pr-{pr['number']}": pr['number'] for pr in missing}
+        failed = []
+
+        # A fetch fails as a whole when one ref is missing on the remote, so those refs are dropped and the rest retried
+        while refspecs:
+            try:
+                result = self._fetch_refspecs(list(refspecs))
+            except Exception as e:
+                logger.debug(f"Failed to fetch PR refs: {e}")
+                failed += refspecs.values()
+                break
+            if result.returncode == 0:
+                break
+
+            unknown = [refspec for refspec in refspecs
+                       if f"couldn't find remote ref {refspec[1:].split(':')[0]}" in result.stderr]
+            if not unknown:
+                logger.debug(f"Git fetch failed: {result.stderr}")
+                failed += refspecs.values()
+                break
+            for refspec in unknown:
+                failed.append(refspecs.pop(refspec))
+
+        if missing:
+            logger.info(f"Fetched {len(missing) - len(failed)} of {len(missing)} missing PR heads in one batch")
+        if failed:
+            logger.warning(f"Could not fetch the head ref of PRs: {', '.join(f'#{n}' for n in sorted(failed))}")
+        return failed
+
+    def _numstat_from_git(self, base_sha: str, head_sha: str) -> Optional[List[Tuple[Optional[int], Optional[int], str, Optional[str]]]]:
+        """Per-file added/deleted line counts between two commits, None when git fails."""
         try:
             result = subprocess.run(
-                ['git', 'fetch', 'origin', f'pull/{pr_number}/head:pr-{pr_number}'],
+                ['git', 'diff', '--numstat', '-z', f'{base_sha}..{head_sha}'],
                 cwd=self.repo_path,
                 capture_output=True,
                 text=True,
@@ -1405,295 +1554,443 @@ class PRAnalyzer:
                 errors='replace',
                 timeout=60
             )
-            return result.returncode == 0
-        except Exception as e:
-            logger.debug(f"Failed to fetch PR ref: {e}")
-            return False
+        except subprocess.TimeoutExpired:
+            logger.warning(f"Git diff --numstat timed out for {base_sha}..{head_sha}")
+            return None
+        if result.returncode != 0:
+            logger.debug(f"Git diff --numstat failed: {result.stderr}")
+            return None
+        return parse_numstat_z(result.stdout)
 
-    def _get_patch_from_git(self, base_sha: str, head_sha: str, pr_number: Optional[int] = None) -> Optional[str]:
-        """Get patch/diff between two commits using local git."""
-        try:
-            # Check if commits exist, try to fetch PR ref if head is missing
-            if not self._commit_exists(head_sha) and pr_number:
-                logger.debug(f"Head commit {head_sha[:8]} not found, fetching PR #{pr_number} ref...")
-                if self._fetch_pr_ref(pr_number):
-                    logger.debug(f"Successfully fetched PR #{pr_number} ref")
-                else:
-                    logger.debug(f"Failed to fetch PR #{pr_number} ref")
-                    return None
+    def _check_code_changes(self, base_sha: str, head_sha: str, pr_number: Optional[int] = None,
+                            pr_files_nodes: Optional[list] = None, check_rust_tests: bool = False) -> Optional[Dict]:
+        """
+        Decide the code changes and Rust embedded tests filters of a PR.
+
+        The numstat of the diff gives an upper bound of the source code changes, which is enough to
+        reject most PRs. Only when the bound reaches min_code_changes, or Rust files have to be
+        searched for tests, is the patch read, and then only for those files. Git only pairs a
+        rename when both of its paths are diffed, so diffs with renames or copies are read whole.
 
-            # Verify both commits exist now
+        Returns the scan_patch_lines result, or None when the diff cannot be retrieved.
+        """
+        try:
+            # Missing heads were fetched for the whole page by _prefetch_pr_heads
             if not self._commit_exists(base_sha):
                 logger.debug(f"Base commit {base_sha[:8]} not found in local repo")
                 return None
             if not self._commit_exists(head_sha):
-                logger.debug(f"Head commit {head_sha[:8]} still not found after fetch")
+                logger.debug(f"Head commit {head_sha[:8]} of PR #{pr_number} not found after fetch")
                 return None
 
-            result = subprocess.run(
-                ['git', 'diff', f'{base_sha}..{head_sha}'],
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=60
-            )
-            if result.returncode == 0:
-                return result.stdout
-            else:
-                logger.debug(f"Git diff failed: {result.stderr}")
+            numstat = self._numstat_from_git(base_sha, head_sha)
+            if not numstat:
                 return None
-        except subprocess.TimeoutExpired:
-            logger.warning(f"Git diff timed out for {base_sha}..{head_sha}")
+            max_source_changes, source_files = numstat_source_changes(numstat, self.language_config)
+
+            rust_files = []
+            if check_rust_tests:
+                rust_filenames = RustTestDetector(pr_files_nodes or [], self.language_config).filenames
+                rust_files = [path for _, _, path, old_path in numstat
+                              if any(filename in path or filename in (old_path or '') for filename in rust_filenames)]
+
+            if not rust_files and (max_source_changes < int(self.min_code_changes) or not source_files):
+                return {
+                    'lines': 0,
+                    'stopped_early': False,
+                    'rust_embedded_tests': False,
+                    'source_changes': max_source_changes,
+                    'exact': max_source_changes == 0
+                }
+
+            if any(old_path for _, _, _, old_path in numstat):
+                pathspecs = None
+            else:
+                pathspecs = list(dict.fromkeys(source_files + rust_files))
+            scan = self._scan_patch_from_git(base_sha, head_sha, pathspecs, pr_number=pr_number,
+                                             pr_files_nodes=pr_files_nodes, check_rust_tests=check_rust_tests)
+            if scan is not None:
+                scan['exact'] = True
+            return scan
+        except Exception as e:
+            logger.warning(f"Error checking code changes: {e}")
             return None
+
+    def _scan_patch_from_git(self, base_sha: str, head_sha: str, pathspecs: Optional[List[str]] = None,
+                             pr_number: Optional[int] = None, pr_files_nodes: Optional[list] = None,
+                             check_rust_tests: bool = False) -> Optional[Dict]:
+        """
+        Stream the diff between two commits, or of the given files only, through scan_patch_lines.
+
+        The patch is read line by line and never held in memory, and git is stopped as soon as the
+        verdict is known. Returns None when the patch cannot be retrieved.
+        """
+        try:
+            with tempfile.TemporaryFile() as stderr:
+                command = ['git', 'diff', f'{base_sha}..{head_sha}']
+                if pathspecs is not None:
+                    # The full diff has no renames, a smaller candidate set must not find any either
+                    command += ['--no-renames', '--', *(f':(literal){path}' for path in pathspecs)]
+                process = subprocess.Popen(
+                    command,
+                    cwd=self.repo_path,
+                    stdout=subprocess.PIPE,
+                    stderr=stderr,
+                    text=True,
+                    encoding='utf-8',
+                    errors='replace'
+                )
+                timed_out = threading.Event()
+
+                def _kill():
+                    timed_out.set()
+                    process.kill()
+
+                timer = threading.Timer(60, _kill)
+                timer.start()
+                try:
+                    scan = scan_patch_lines(process.stdout, self.language_config, self.min_code_changes,
+                                            pr_files_nodes=pr_files_nodes, check_rust_tests=check_rust_tests)
+                finally:
+                    timer.cancel()
+                    # Closing the pipe stops git when the rest of the diff is not needed
+                    process.stdout.close()
+                    process.wait()
+
+                if timed_out.is_set():
+                    logger.warning(f"Git diff timed out for {base_sha}..{head_sha}")
+                    return None
+                if not scan['stopped_early'] and process.returncode != 0:
+                    stderr.seek(0)
+                    logger.debug(f"Git diff failed: {stderr.read().decode('utf-8', errors='replace')}")
+                    return None
+                return scan
         except Exception as e:
             logger.warning(f"Error getting patch: {e}")
             return None
 
+    def _needs_patch(self, pr_data: dict) -> bool:
+        """Check if a PR passes the metadata and file filters, so its diff will be read."""
+        try:
+            return not self._check_metadata(pr_data)[0] and not self._check_files(pr_data)[0]
+        except Exception:
+            # _evaluate_pr reports the error of this PR, the rest of its page is still prefetched
+            return False
+
+    def _check_metadata(self, pr_data: dict) -> Tuple[Optional[str], Optional[str]]:
+        """Bot, date and language filters, which only need the PR metadata."""
+        # Parse dates - handle both GitHub (Z suffix) and Bitbucket (no Z) formats
+        created_at_str = pr_data['createdAt']
+        if created_at_str.endswith('Z'):
+            created_at_str = created_at_str.replace('Z', '+00:00')
+        elif '+' not in created_at_str and created_at_str.count(':') == 2:
+            # Bitbucket format without timezone - assume UTC
+            created_at_str = created_at_str + '+00:00'
+        pr_created_at = normalize_to_utc(datetime.fromisoformat(created_at_str))
+
+        merged_at_str = pr_data['mergedAt']
+        if merged_at_str.endswith('Z'):
+            merged_at_str = merged_at_str.replace('Z', '+00:00')
+        elif '+' not in merged_at_str and merged_at_str.count(':') == 2:
+            # Bitbucket format without timezone - assume UTC
+            merged_at_str = merged_at_str + '+00:00'
+        pr_merged_at = normalize_to_utc(datetime.fromisoformat(merged_at_str))
+
+        # Apply filters
+        failed_filter = None
+        filter_reason = None
+
+        # Bot filter - skip PRs from bots
+        author_info = pr_data.get('author', {})
+        # Check __typename to see if author is a Bot
+        is_bot = author_info.get('__typename') == 'Bot' if author_info else False
+        author_login = author_info.get('login', '') if author_info else ''
+
+        # Also check username pattern as fallback
+        if not is_bot and author_login:
+            is_bot = _is_bot_username(author_login)
+
+        if is_bot:
+            failed_filter = "bot_pr"
+            filter_reason = f"PR is from bot account: {author_login}"
+
+        # Date filters
+        if not failed_filter and self.start_date and pr_merged_at < self.start_date:
+            failed_filter = "merge_date"
+            filter_reason = f"PR merged {pr_merged_at.date()} before start date {self.start_date.date()}"
+        elif pr_created_at is None:
+            failed_filter = "creation_date"
+            filter_reason = "PR has no createdAt date"
+
+        # Content filter
+        if not failed_filter:
+            pr_body = pr_data.get('body', '') or ''
+            if not (is_english(pr_data.get('title', '')) and is_english(pr_body)):
+                failed_filter = "content_not_in_english"
+                filter_reason = "Content may not be in English"
+
+        return failed_filter, filter_reason
+
+    def _check_files(self, pr_data: dict) -> Tuple[Optional[str], Optional[str]]:
+        """Test file, non-test file and difficulty filters on the PR's file list."""
+        failed_filter = None
+        filter_reason = None
+
+        pr_files_nodes = pr_data.get(
+            'files', {}).get('nodes', [])
+        test_files = [f for f in pr_files_nodes if is_test_file_path(
+            f['path'], self.language_config) and not is_asset_file_path(f['path'], self.language_config)]
+        non_test_files = [f for f in pr_files_nodes if not is_test_file_path(
+            f['path'], self.language_config) and not is_asset_file_path(f['path'], self.language_config)]
+
+        if len(test_files) < self.min_test_files:
+            failed_filter = "fewer_than_min_test_files"
+            filter_reason = f"PR has fewer than {self.min_test_files} test files"
+        elif len(non_test_files) > self.max_non_test_files:
+            failed_filter = "more_than_max_non_test_files"
+            filter_reason = f"PR has more than {self.max_non_test_files} non-test files"
+        elif len(non_test_files + test_files) <= 5: # Difficulty filter
+            failed_filter = "difficulty_not_hard"
+            filter_reason = "PR has less than 5 files (difficulty not hard enough)"
+
+        return failed_filter, filter_reason
+
+    def _evaluate_pr(self, pr_data: dict, language_name: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Run every filter on a PR.
+
+        Returns (failed_filter, filter_reason), both None when the PR is accepted.
+        Runs on the worker threads of analyze_prs.
+        """
+        pr_number = pr_data['number']
+        pr_body = pr_data.get('body', '') or ''
+        pr_files_nodes = pr_data.get('files', {}).get('nodes', [])
+
+        failed_filter, filter_reason = self._check_metadata(pr_data)
+
+        # Closing issues validation
+        if not failed_filter:
+            closing_issues = pr_data.get('closingIssuesReferences', {}).get('nodes', [])
+
+            # If no closing issues from API, try regex extraction from PR body
+            if not closing_issues:
+                issue_numbers = self.platform_client.extract_issue_number_from_text(pr_body)
+                if issue_numbers:
+                    logger.info(f"PR #{pr_number}: Using regex fallback for issues {issue_numbers} via API.")
+                    for issue_num in issue_numbers:
+                        try:
+                            issue_data_from_api = self.platform_client.fetch_issue(issue_num)
+                            if issue_data_from_api:
+                                closing_issues.append(issue_data_from_api)
+                        except Exception as e:
+                            logger.warning(f"Failed to fetch fallback issue #{issue_num} via API: {e}")
+
+            # If we have closing issues, validate them
+            if closing_issues:
+                found_valid_issue = False
+                for issue_data in closing_issues:
+                    issue_number = issue_data.get('number')
+                    issue_typename = issue_data.get('__typename', 'Issue')
+
+                    # Check if issue is not a PR
+                    if issue_typename == 'PullRequest':
+                        continue  # Skip this issue, try next one
+
+                    # Check if issue is closed
+                    issue_state = issue_data.get('state', '').lower()
+                    if issue_state != 'closed':
+                        continue  # Skip this issue, try next one
+
+                    # Check word count
+                    issue_body = issue_data.get('body', '') or ''
+                    if not has_valid_issue_word_count(issue_body):
+                        continue  # Skip this issue, try next one
+
+                    # If we get here, this issue passed all validations
+                    found_valid_issue = True
+                    break  # Found a valid issue, no need to check others
+
+                # If no issue passed validation, reject the PR
+                if not found_valid_issue:
+                    # Use the first issue's failure reason (or a generic one)
+                    first_issue = closing_issues[0]
+                    issue_number = first_issue.get('number')
+                    issue_typename = first_issue.get('__typename', 'Issue')
+
+                    if issue_typename == 'PullRequest':
+                        failed_filter = "issue_is_a_pr"
+                        filter_reason = f"Linked issue #{issue_number} is a Pull Request"
+                    else:
+                        issue_state = first_issue.get('state', '').lower()
+                        if issue_state != 'closed':
+                            failed_filter = "issue_is_not_closed"
+                            filter_reason = f"Linked issue #{issue_number} is not closed (state: {issue_state})"
+                        else:
+                            issue_body = first_issue.get('body', '') or ''
+                            word_count = count_words(issue_body)
+                            failed_filter = "issue_word_count"
+                            filter_reason = f"Issue #{issue_number} word count ({word_count}) is outside {MIN_ISSUE_WORDS}-{MAX_ISSUE_WORDS} range"
+            # If no closing issues found at all, continue with PR analysis (don't reject)
+
+        # File filters
+        if not failed_filter:
+            failed_filter, filter_reason = self._check_files(pr_data)
+
+        # Code changes filter (requires patch)
+        if not failed_filter:
+            try:
+                patch_scan = self._check_code_changes(
+                    pr_data['baseRefOid'],
+                    pr_data['headRefOid'],
+                    pr_number=pr_number,
+                    pr_files_nodes=pr_files_nodes,
+                    check_rust_tests=language_name == "Rust"
+                )
+                if not patch_scan:
+                    failed_filter = "full_patch_retrieval"
+                    filter_reason = "Could not retrieve full patch"
+                # Rust embedded tests check
+                elif patch_scan['rust_embedded_tests']:
+                    failed_filter = "rust_embedded_tests"
+                    filter_reason = "Rust files contain embedded tests"
+                # Check code changes
+                elif patch_scan['source_changes'] < int(self.min_code_changes):
+                    failed_filter = "code_changes_not_sufficient"
+                    if patch_scan['exact']:
+                        filter_reason = f"Code changes {patch_scan['source_changes']} below {self.min_code_changes}"
+                    else:
+                        filter_reason = f"Code changes (at most {patch_scan['source_changes']}) below {self.min_code_changes}"
+            except Exception as e:
+                logger.warning(
+                    f"Error processing PR #{pr_number}: {e}")
+                failed_filter = "pr_processing_error"
+                filter_reason = f"Exception during processing: {str(e)}"
+
+        return failed_filter, filter_reason
+
     def analyze_prs(self, max_prs: Optional[int] = None) -> PRRejectionStats:
-        """Analyze PRs and track rejections."""
+        """
+        Analyze PRs and track rejections.
+
+        PR pages are fetched on the calling thread, which also fetches the missing PR heads of each
+        page in one batch, while a pool of `workers` threads validates the linked issues and
+        retrieves the patches. Results, and the log lines of each PR, are aggregated in PR order,
+        so neither depends on which PR finishes first.
+        """
         logger.info(f"Analyzing PRs for {self.repo_full_name}...")
 
         cursor = None
+        submitted = 0
         total_prs = 0
         accepted = 0
         rejected = 0
         rejection_reasons = {}
         accepted_prs = []
+        pending = deque()
+        deferred_logs = DeferredLogs()
 
-        while True:
-            try:
-                res = self.platform_client.fetch_prs(cursor, page_size=50, start_date=self.start_date)
-
-                if res.get('errors'):
-                    error_msg = res['errors'][0]['message']
-                    # Check for rate limit errors
-                    if "rate limit" in error_msg.lower() or "403" in error_msg:
-                        logger.error(
-                            f"API rate limit exceeded. Please provide a token using --token")
-                    logger.error(f"API error: {error_msg}")
-                    break
+        def aggregate_oldest():
+            nonlocal total_prs, accepted, rejected
 
-                repo_data = res.get('data', {}).get('repository', {})
-                search_data = res.get('data', {}).get('search', {})
-                pr_data = repo_data.get('pullRequests', {})
-                language_name = repo_data.get(
-                    'primaryLanguage', {}).get('name', None)
-                pr_nodes = pr_data.get('nodes', [])
-                page_info = pr_data.get('pageInfo', {})
+            pr_data, future = pending.popleft()
+            pr_number = pr_data['number']
+            logger.info(f"Processing PR #{pr_number}...")
 
-                if not pr_nodes:
-                    break
+            result, error, records = future.result()
+            for record in records:
+                logger.handle(record)
+            if error is None:
+                failed_filter, filter_reason = result
+            else:
+                logger.warning(
+                    f"Error processing PR #{pr_number}: {error}")
+                failed_filter = "pr_processing_error"
+                filter_reason = f"Exception during processing: {str(error)}"
+
+            # Track results
+            total_prs += 1
+            if failed_filter:
+                rejected += 1
+                rejection_reasons[failed_filter] = rejection_reasons.get(
+                    failed_filter, 0) + 1
+                logger.info(
+                    f"PR #{pr_number} rejected: {failed_filter} - {filter_reason}")
+            else:
+                accepted += 1
+                accepted_prs.append(pr_data)
+                logger.info(f"PR #{pr_number} accepted")
 
-                for pr_data in pr_nodes:
-                    if max_prs and total_prs >= max_prs:
+        logger.addFilter(deferred_logs)
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                while True:
+                    try:
+                        res = self.platform_client.fetch_prs(cursor, page_size=50, start_date=self.start_date)
+
+                        if res.get('errors'):
+                            error_msg = res['errors'][0]['message']
+                            # Check for rate limit errors
+                            if "rate limit" in error_msg.lower() or "403" in error_msg:
+                                logger.error(
+                                    f"API rate limit exceeded. Please provide a token using --token")
+                            logger.error(f"API error: {error_msg}")
+                            break
+
+                        repo_data = res.get('data', {}).get('repository', {})
+                        pr_data = repo_data.get('pullRequests', {})
+                        language_name = repo_data.get(
+                            'primaryLanguage', {}).get('name', None)
+                        pr_nodes = pr_data.get('nodes', [])
+                        page_info = pr_data.get('pageInfo', {})
+
+                        if not pr_nodes:
+                            break
+
+                        if max_prs:
+                            pr_nodes = pr_nodes[:max(0, max_prs - submitted)]
+
+                        # Only PRs that pass the metadata and file filters get as far as needing their patch
+                        self.failed_fetches += self._prefetch_pr_heads([pr for pr in pr_nodes if self._needs_patch(pr)])
+
+                        for pr_data in pr_nodes:
+                            pending.append((pr_data, executor.submit(
+                                deferred_logs.capture, self._evaluate_pr, pr_data, language_name)))
+                            submitted += 1
+
+                            # Bound the PRs in flight, so paging never runs far ahead of the workers
+                            while len(pending) > self.workers * 2:
+                                aggregate_oldest()
+
+                        if max_prs and submitted >= max_prs:
+                            break
+
+                        if not page_info.get('hasNextPage'):
+                            break
+                        cursor = page_info.get('endCursor')
+
+                    except Exception as e:
+                        error_str = str(e)
+                        # Check for rate limit errors
+                        if "rate limit" in error_str.lower() or "403" in error_str:
+                            logger.error(
+                                f"API rate limit exceeded. Please provide a token using --token")
+                            logger.error(f"Error: {e}")
+                        elif "Failed to resolve" in error_str or "nodename nor servname" in error_str:
+                            logger.error(
+                                f"Network/DNS error fetching PRs from {self.repo_full_name}: {e}")
+                            logger.error("This could be a temporary network issue. Please check your internet connection and try again.")
+                        else:
+                            logger.error(
+                                f"Error fetching PRs from {self.repo_full_name} for cursor {cursor}: {e}")
                         break
 
-                    logger.info(f"Processing PR #{pr_data['number']}...")
-
-                    # Parse dates - handle both GitHub (Z suffix) and Bitbucket (no Z) formats
-                    created_at_str = pr_data['createdAt']
-                    if created_at_str.endswith('Z'):
-                        created_at_str = created_at_str.replace('Z', '+00:00')
-                    elif '+' not in created_at_str and created_at_str.count(':') == 2:
-                        # Bitbucket format without timezone - assume UTC
-                        created_at_str = created_at_str + '+00:00'
-                    pr_created_at = normalize_to_utc(datetime.fromisoformat(created_at_str))
-
-                    merged_at_str = pr_data['mergedAt']
-                    if merged_at_str.endswith('Z'):
-                        merged_at_str = merged_at_str.replace('Z', '+00:00')
-                    elif '+' not in merged_at_str and merged_at_str.count(':') == 2:
-                        # Bitbucket format without timezone - assume UTC
-                        merged_at_str = merged_at_str + '+00:00'
-                    pr_merged_at = normalize_to_utc(datetime.fromisoformat(merged_at_str))
-                    pr_number = pr_data['number']
-
-                    total_prs += 1
-
-                    # Apply filters
-                    failed_filter = None
-                    filter_reason = None
-
-                    # Bot filter - skip PRs from bots
-                    author_info = pr_data.get('author', {})
-                    # Check __typename to see if author is a Bot
-                    is_bot = author_info.get('__typename') == 'Bot' if author_info else False
-                    author_login = author_info.get('login', '') if author_info else ''
-
-                    # Also check username pattern as fallback
-                    if not is_bot and author_login:
-                        is_bot = _is_bot_username(author_login)
-
-                    if is_bot:
-                        failed_filter = "bot_pr"
-                        filter_reason = f"PR is from bot account: {author_login}"
-
-                    # Date filters
-                    if not failed_filter and self.start_date and pr_merged_at < self.start_date:
-                        failed_filter = "merge_date"
-                        filter_reason = f"PR merged {pr_merged_at.date()} before start date {self.start_date.date()}"
-                    elif pr_created_at is None:
-                        failed_filter = "creation_date"
-                        filter_reason = "PR has no createdAt date"
-
-                    # Content filter
-                    if not failed_filter:
-                        pr_body = pr_data.get('body', '') or ''
-                        if not (is_english(pr_data.get('title', '')) and is_english(pr_body)):
-                            failed_filter = "content_not_in_english"
-                            filter_reason = "Content may not be in English"
-
-                    # Closing issues validation
-                    if not failed_filter:
-                        closing_issues = pr_data.get('closingIssuesReferences', {}).get('nodes', [])
-
-                        # If no closing issues from API, try regex extraction from PR body
-                        if not closing_issues:
-                            issue_numbers = self.platform_client.extract_issue_number_from_text(pr_body)
-                            if issue_numbers:
-                                logger.info(f"PR #{pr_number}: Using regex fallback for issues {issue_numbers} via API.")
-                                for issue_num in issue_numbers:
-                                    try:
-                                        issue_data_from_api = self.platform_client.fetch_issue(issue_num)
-                                        if issue_data_from_api:
-                                            closing_issues.append(issue_data_from_api)
-                                    except Exception as e:
-                                        logger.warning(f"Failed to fetch fallback issue #{issue_num} via API: {e}")
-
-                        # If we have closing issues, validate them
-                        if closing_issues:
-                            found_valid_issue = False
-                            for issue_data in closing_issues:
-                                issue_number = issue_data.get('number')
-                                issue_typename = issue_data.get('__typename', 'Issue')
-
-                                # Check if issue is not a PR
-                                if issue_typename == 'PullRequest':
-                                    continue  # Skip this issue, try next one
-
-                                # Check if issue is closed
-                                issue_state = issue_data.get('state', '').lower()
-                                if issue_state != 'closed':
-                                    continue  # Skip this issue, try next one
-
-                                # Check word count
-                                issue_body = issue_data.get('body', '') or ''
-                                if not has_valid_issue_word_count(issue_body):
-                                    continue  # Skip this issue, try next one
-
-                                # If we get here, this issue passed all validations
-                                found_valid_issue = True
-                                break  # Found a valid issue, no need to check others
-
-                            # If no issue passed validation, reject the PR
-                            if not found_valid_issue:
-                                # Use the first issue's failure reason (or a generic one)
-                                first_issue = closing_issues[0]
-                                issue_number = first_issue.get('number')
-                                issue_typename = first_issue.get('__typename', 'Issue')
-
-                                if issue_typename == 'PullRequest':
-                                    failed_filter = "issue_is_a_pr"
-                                    filter_reason = f"Linked issue #{issue_number} is a Pull Request"
-                                else:
-                                    issue_state = first_issue.get('state', '').lower()
-                                    if issue_state != 'closed':
-                                        failed_filter = "issue_is_not_closed"
-                                        filter_reason = f"Linked issue #{issue_number} is not closed (state: {issue_state})"
-                                    else:
-                                        issue_body = first_issue.get('body', '') or ''
-                                        word_count = count_words(issue_body)
-                                        failed_filter = "issue_word_count"
-                                        filter_reason = f"Issue #{issue_number} word count ({word_count}) is outside {MIN_ISSUE_WORDS}-{MAX_ISSUE_WORDS} range"
-                        # If no closing issues found at all, continue with PR analysis (don't reject)
-
-                    # File filters
-                    if not failed_filter:
-                        pr_files_nodes = pr_data.get(
-                            'files', {}).get('nodes', [])
-                        test_files = [f for f in pr_files_nodes if is_test_file_path(
-                            f['path'], self.language_config) and not is_asset_file_path(f['path'], self.language_config)]
-                        non_test_files = [f for f in pr_files_nodes if not is_test_file_path(
-                            f['path'], self.language_config) and not is_asset_file_path(f['path'], self.language_config)]
-
-                        if len(test_files) < self.min_test_files:
-                            failed_filter = "fewer_than_min_test_files"
-                            filter_reason = f"PR has fewer than {self.min_test_files} test files"
-                        elif len(non_test_files) > self.max_non_test_files:
-                            failed_filter = "more_than_max_non_test_files"
-                            filter_reason = f"PR has more than {self.max_non_test_files} non-test files"
-                        elif len(non_test_files + test_files) <= 5: # Difficulty filter
-                            failed_filter = "difficulty_not_hard"
-                            filter_reason = "PR has less than 5 files (difficulty not hard enough)"
-
-                    # Code changes filter (requires patch)
-                    if not failed_filter:
-                        try:
-                            full_patch = self._get_patch_from_git(
-                                pr_data['baseRefOid'],
-                                pr_data['headRefOid'],
-                                pr_number=pr_number
-                            )
-                            if not full_patch:
-                                failed_filter = "full_patch_retrieval"
-                                filter_reason = "Could not retrieve full patch"
-                            else:
-                                # Rust embedded tests check
-                                if language_name == "Rust" and has_rust_embedded_tests(pr_files_nodes, full_patch, self.language_config):
-                                    failed_filter = "rust_embedded_tests"
-                                    filter_reason = "Rust files contain embedded tests"
-                                else:
-                                    # Check code changes
-                                    has_sufficient, source_changes = has_sufficient_code_changes(
-                                        full_patch,
-                                        self.language_config,
-                                        self.min_code_changes
-                                    )
-                                    if not has_sufficient:
-                                        failed_filter = "code_changes_not_sufficient"
-                                        filter_reason = f"Code changes {source_changes} below {self.min_code_changes}"
-                        except Exception as e:
-                            logger.warning(
-                                f"Error processing PR #{pr_number}: {e}")
-                            failed_filter = "pr_processing_error"
-                            filter_reason = f"Exception during processing: {str(e)}"
-
-                    # Track results
-                    if failed_filter:
-                        rejected += 1
-                        rejection_reasons[failed_filter] = rejection_reasons.get(
-                            failed_filter, 0) + 1
-                        logger.info(
-                            f"PR #{pr_number} rejected: {failed_filter} - {filter_reason}")
-                    else:
-                        accepted += 1
-                        accepted_prs.append(pr_data)
-                        logger.info(f"PR #{pr_number} accepted")
-
-                if max_prs and total_prs >= max_prs:
-                    break
-
-                if not page_info.get('hasNextPage'):
-                    break
-                cursor = page_info.get('endCursor')
+                while pending:
+                    aggregate_oldest()
+        finally:
+            logger.removeFilter(deferred_logs)
 
-            except Exception as e:
-                error_str = str(e)
-                # Check for rate limit errors
-                if "rate limit" in error_str.lower() or "403" in error_str:
-                    logger.error(
-                        f"API rate limit exceeded. Please provide a token using --token")
-                    logger.error(f"Error: {e}")
-                elif "Failed to resolve" in error_str or "nodename nor servname" in error_str:
-                    logger.error(
-                        f"Network/DNS error fetching PRs from {self.repo_full_name}: {e}")
-                    logger.error("This could be a temporary network issue. Please check your internet connection and try again.")
-                else:
-                    logger.error(
-                        f"Error fetching PRs from {self.repo_full_name} for cursor {cursor}: {e}")
-                break
+        # Restarted on demand if the analyzer is used again
+        self._object_checker.close()
 
         # Build rejection breakdown
         rejection_breakdown = {}
@@ -1722,7 +2019,8 @@ class RepoEvaluator:
                  max_non_test_files: int = MAX_NON_TEST_FILES,
                  min_code_changes: int = MIN_PR_CODE_CHANGES,
                  start_date: Optional[datetime] = None,
-                 max_prs: Optional[int] = None):
+                 max_prs: Optional[int] = None,
+                 workers: int = PR_WORKERS):
         self.repo_path = repo_path
         self.owner = owner
         self.repo_name = repo_name
@@ -1734,6 +2032,7 @@ class RepoEvaluator:
         self.min_code_changes = min_code_changes
         self.start_date = start_date
         self.max_prs = max_prs
+        self.workers = workers
 
         self.language_config = load_language_config()
 
@@ -1774,6 +2073,7 @@ class RepoEvaluator:
             max_non_test_files=self.max_non_test_files,
             min_code_changes=self.min_code_changes,
             start_date=self.start_date,
+            workers=self.workers,
         )
 
         try:
@@ -1926,6 +2226,13 @@ Examples:
         help=f'Minimum code changes per PR (default: {MIN_PR_CODE_CHANGES})'
     )
 
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=PR_WORKERS,
+        help=f'PRs validated and diffed concurrently (default: {PR_WORKERS})'
+    )
+
     parser.add_argument(
         '--output',
         choices=['json', 'text'],
@@ -1997,7 +2304,8 @@ Examples:
             max_non_test_files=args.max_non_test_files,
             min_code_changes=args.min_code_changes,
             start_date=start_date,
-            max_prs=args.max_prs
+            max_prs=args.max_prs,
+            workers=args.workers
         )
 
         report = evaluator.evaluate()
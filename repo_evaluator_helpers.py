@@ -4,7 +4,7 @@ Helper functions for repository evaluation.
 
 import os
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 from datetime import timezone
 
 # GitHub API headers
@@ -338,29 +338,93 @@ def get_full_patch_content(repo_full_name: str, base_commit: str, head_commit: s
         return None
 
 
-def extract_diff_stats_simple(full_patch: str, language_config: Dict) -> Optional[Dict]:
+def is_counted_source_path(filename: str, language_config: Dict) -> bool:
+    """Check if changes to a file count as source code changes (source file, not a test or asset)."""
+    source_extensions = language_config.get("file_analysis", {}).get("source_extensions", [])
+    if not source_extensions:
+        source_extensions = _GENERIC_SOURCE_EXTENSIONS
+
+    # Check if it's a source file
+    if not any(filename.endswith(ext) for ext in source_extensions):
+        return False
+    # Check it's not a test or asset file
+    return not is_test_file_path(filename, language_config) and not is_asset_file_path(filename, language_config)
+
+
+def parse_numstat_z(output: str) -> List[Tuple[Optional[int], Optional[int], str, Optional[str]]]:
     """
-    Counts source code additions/deletions by parsing the diff.
+    Parse `git diff --numstat -z` output into (added, deleted, path, old_path) tuples.
+
+    Binary files have None counts. Renamed and copied files are reported under their new path,
+    with the path they came from as old_path (None for every other file).
     """
-    if not full_patch:
-        return None
+    entries = []
+    fields = output.split('\0')
+    i = 0
+    while i < len(fields):
+        record = fields[i]
+        i += 1
+        if not record:
+            continue
+        added, deleted, path = record.split('\t', 2)
+        old_path = None
+        if not path:
+            # Renames and copies: "added<TAB>deleted<TAB>" followed by the old and new path
+            old_path, path = fields[i], fields[i + 1]
+            i += 2
+        entries.append((
+            None if added == '-' else int(added),
+            None if deleted == '-' else int(deleted),
+            path,
+            old_path
+        ))
+    return entries
+
+
+def numstat_source_changes(
+    numstat: List[Tuple[Optional[int], Optional[int], str, Optional[str]]],
+    language_config_for_repo: dict
+) -> Tuple[int, List[str]]:
+    """
+    Upper bound of the source code changes of a diff, from its numstat entries.
 
-    source_code_added = 0
-    source_code_deleted = 0
+    has_sufficient_code_changes counts the same lines minus blank lines and comments, so it never
+    counts more. Returns the bound and the source files it was computed from.
+    """
+    config = code_changes_config(language_config_for_repo)
+    changes = 0
+    paths = []
+    for added, deleted, path, _ in numstat:
+        if is_counted_source_path(path, config):
+            changes += (added or 0) + (deleted or 0)
+            paths.append(path)
+    return changes, paths
 
-    source_extensions = language_config.get("file_analysis", {}).get("source_extensions", [])
 
-    if not source_extensions:
-        source_extensions = _GENERIC_SOURCE_EXTENSIONS
+class DiffStatsCounter:
+    """
+    Counts source code additions/deletions, one diff line at a time.
 
-    current_file = None
-    in_hunk = False
+    Blank lines and lines starting with common comment markers are not counted, nor are test and
+    asset files.
+    """
 
-    for line in full_patch.split('\n'):
+    def __init__(self, language_config: Dict):
+        self.language_config = language_config
+        self.source_extensions = language_config.get("file_analysis", {}).get("source_extensions", [])
+        if not self.source_extensions:
+            self.source_extensions = _GENERIC_SOURCE_EXTENSIONS
+
+        self.source_code_added = 0
+        self.source_code_deleted = 0
+        self.current_file = None
+        self.in_hunk = False
+
+    def feed(self, line: str):
         # Detect file start
         if line.startswith('diff --git'):
-            current_file = None
-            in_hunk = False
+            self.current_file = None
+            self.in_hunk = False
             # Extract filename from the "b/" path (new file version)
             parts = line.split()
             if len(parts) >= 4:
@@ -370,31 +434,58 @@ def extract_diff_stats_simple(full_patch: str, language_config: Dict) -> Optiona
                 # Fallback: try to extract from parts[2] and remove both a/ and b/ prefixes
                 filename = parts[2].replace('a/', '').replace('b/', '')
             else:
-                continue
-            # Check if it's a source file
-            is_source = any(filename.endswith(ext) for ext in source_extensions)
-            if is_source:
-                # Check it's not a test or asset file
-                if not is_test_file_path(filename, language_config):
-                    if not is_asset_file_path(filename, language_config):
-                        current_file = filename
+                return
+            if is_counted_source_path(filename, self.language_config):
+                self.current_file = filename
         elif line.startswith('@@'):
-            in_hunk = True
-        elif in_hunk and current_file:
+            self.in_hunk = True
+        elif self.in_hunk and self.current_file:
             # Count additions and deletions (excluding comments and blank lines)
             if line.startswith('+') and not line.startswith('+++'):
                 content = line[1:].strip()
                 # Skip blank lines and common comment patterns
                 if content and not content.startswith('//') and not content.startswith('#'):
-                    source_code_added += 1
+                    self.source_code_added += 1
             elif line.startswith('-') and not line.startswith('---'):
                 content = line[1:].strip()
                 if content and not content.startswith('//') and not content.startswith('#'):
-                    source_code_deleted += 1
+                    self.source_code_deleted += 1
 
+    @property
+    def source_code_changes(self) -> int:
+        return self.source_code_added + self.source_code_deleted
+
+    def stats(self) -> Dict:
+        return {
+            'source_code_added': self.source_code_added,
+            'source_code_deleted': self.source_code_deleted
+        }
+
+
+def extract_diff_stats_simple(full_patch: str, language_config: Dict) -> Optional[Dict]:
+    """
+    Counts source code additions/deletions by parsing the diff.
+    """
+    if not full_patch:
+        return None
+
+    counter = DiffStatsCounter(language_config)
+    for line in full_patch.split('\n'):
+        counter.feed(line)
+    return counter.stats()
+
+
+def code_changes_config(language_config_for_repo: dict) -> dict:
+    # Use a merged config that includes both language-specific and generic extensions
+    # This ensures we detect source code changes even if the PR modifies files in a different
+    # language than the repository's primary language
     return {
-        'source_code_added': source_code_added,
-        'source_code_deleted': source_code_deleted
+        "file_analysis": {
+            "source_extensions": list(set(
+                language_config_for_repo.get("file_analysis", {}).get("source_extensions", []) +
+                _GENERIC_SOURCE_EXTENSIONS
+            ))
+        }
     }
 
 
@@ -408,19 +499,7 @@ def has_sufficient_code_changes(
         if not full_patch:
             return False, 0
 
-        # Use a merged config that includes both language-specific and generic extensions
-        # This ensures we detect source code changes even if the PR modifies files in a different
-        # language than the repository's primary language
-        merged_config = {
-            "file_analysis": {
-                "source_extensions": list(set(
-                    language_config_for_repo.get("file_analysis", {}).get("source_extensions", []) +
-                    _GENERIC_SOURCE_EXTENSIONS
-                ))
-            }
-        }
-
-        stats = extract_diff_stats_simple(full_patch, merged_config)
+        stats = extract_diff_stats_simple(full_patch, code_changes_config(language_config_for_repo))
         if not stats:
             return False, 0
 
@@ -477,6 +556,77 @@ def has_rust_embedded_tests(pr_files_nodes: list, full_patch: str, language_conf
 
     return False
 
+class RustTestDetector:
+    """
+    Looks for embedded tests in the Rust source files of a PR, one diff line at a time.
+
+    Matches what has_rust_embedded_tests finds in a full patch.
+    """
+
+    def __init__(self, pr_files_nodes: list, language_config_for_repo: dict):
+        self.filenames = [
+            f['path'] for f in pr_files_nodes
+            if f['path'].endswith('.rs')
+            and not is_test_file_path(f['path'], language_config_for_repo)
+            and not is_asset_file_path(f['path'], language_config_for_repo)
+        ]
+        self.in_target_file = False
+        self.found = False
+
+    def feed(self, line: str):
+        if line.startswith('diff --git'):
+            self.in_target_file = any(line.endswith(f'b/{filename}') for filename in self.filenames)
+        elif line.startswith('+++') and any(filename in line for filename in self.filenames):
+            self.in_target_file = True
+        if self.in_target_file and (line.startswith('+') or line.startswith(' ')):
+            if _has_rust_test_content(line[1:]):
+                self.found = True
+
+
+def scan_patch_lines(
+    lines: Iterable[str],
+    language_config_for_repo: dict,
+    min_code_changes: int,
+    pr_files_nodes: Optional[list] = None,
+    check_rust_tests: bool = False
+) -> Dict:
+    """
+    Single pass over the lines of a unified diff, e.g. streamed from `git diff`.
+
+    Computes what has_rust_embedded_tests and has_sufficient_code_changes compute from a full
+    patch, and stops reading as soon as the verdict cannot change any more.
+
+    Returns a dict with 'lines' (number of lines read), 'stopped_early' (the rest of the diff was
+    not read), 'rust_embedded_tests' and 'source_changes' (so far, when stopped early).
+    """
+    counter = DiffStatsCounter(code_changes_config(language_config_for_repo))
+    rust_detector = RustTestDetector(pr_files_nodes or [], language_config_for_repo) if check_rust_tests else None
+    if rust_detector and not rust_detector.filenames:
+        rust_detector = None
+
+    line_count = 0
+    stopped_early = False
+    for line in lines:
+        line = line.rstrip('\n')
+        line_count += 1
+        counter.feed(line)
+        if rust_detector:
+            rust_detector.feed(line)
+            # Embedded tests reject the PR whatever the code changes are
+            stopped_early = rust_detector.found
+        else:
+            stopped_early = counter.source_code_changes >= int(min_code_changes)
+        if stopped_early:
+            break
+
+    return {
+        'lines': line_count,
+        'stopped_early': stopped_early,
+        'rust_embedded_tests': bool(rust_detector and rust_detector.found),
+        'source_changes': counter.source_code_changes
+    }
+
+
 def normalize_to_utc(dt):
         """Simple UTC normalization fallback."""
         if dt.tzinfo is None:
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the passport photo and identity card pipeline.
+
+A fixed corpus of synthetic portraits, from VGA up to 12MP, is generated on every run, so the
+numbers only change when the code does. For each portrait the benchmark times the stages of the
+production path (face detection, crop_centered_head with the detected face box, make_passport_photo,
+the photo embedding, the SVG fill with that photo on the card's experience colour and every stage
+recorded by pipeline_metrics during a full card) and then measures the throughput of whole cards
+for 1..N worker processes.
+
+The carvekit background remover is replaced by a stub that keys out the plain backdrop of the
+synthetic portraits, so the benchmark runs offline on machines without the model weights. Its
+background_removal timings say nothing about carvekit. The photo cache is disabled, since cache
+hits would hide the stages being measured.
+
+Usage:
+    benchmark_pipeline -t templates/HyScaler_ID_Card_2023 -w 4 -n 3 --json benchmark.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Must be set before the pipeline modules create the cache
+os.environ['ID_CARD_CACHE_SIZE'] = '0'
+
+import cv2
+import numpy as np
+
+import passport_photo_creator
+from generate_id_card import generate_id_card, embed_photo, RENDERERS
+from id_card_template import get_template, experience_color
+from pipeline_metrics import MetricsRun
+
+DEFAULT_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'HyScaler_ID_Card_2023')
+
+# (label, width, height) of the portraits, all 3:4 like phone photos
+CORPUS = [
+    ('VGA', 480, 640),
+    ('1.2MP', 960, 1280),
+    ('3MP', 1536, 2048),
+    ('8MP', 2448, 3264),
+    ('12MP', 3024, 4032),
+]
+
+# BGR, a green screen far from every skin tone of the portraits
+BACKDROP_COLOR = (80, 170, 80)
+
+CARD_FIELDS = {'name': "FirstName LastName", 'code': "NTE-000", 'blood_group': "O+", 'experience': 2}
+
+def synthetic_portrait(width, height, seed=0):
+    # A shaded oval face with dark eye sockets, brows, mouth and hair on a plain backdrop,
+    # which the Haar cascade detects at every resolution of the corpus
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    size = min(width, height)
+    center_x, center_y = width / 2, height * 0.42
+    face_w, face_h = 0.21 * size, 0.28 * size
+
+    u = (xx - center_x) / face_w
+    v = (yy - center_y) / face_h
+    r2 = u ** 2 + v ** 2
+    shoulders = ((xx - center_x) / (0.5 * size)) ** 2 + ((yy - height) / (0.45 * size)) ** 2 < 1
+
+    def blob(x, y, spread_x, spread_y):
+        return np.exp(-(((u - x) / spread_x) ** 2 + ((v - y) / spread_y) ** 2))
+
+    lum = 0.55 + 0.45 * np.sqrt(np.clip(1 - r2, 0, 1))
+    for side in (-0.42, 0.42):
+        lum -= 0.55 * blob(side, -0.22, 0.22, 0.1)
+        lum -= 0.4 * blob(side, -0.42, 0.25, 0.05)
+    lum -= 0.45 * blob(0, 0.5, 0.3, 0.07)
+    lum += 0.1 * blob(0, 0.05, 0.08, 0.25)
+    lum -= 0.5 * ((r2 > 0.8) & (r2 < 1.25) & (v < -0.3))
+    lum = np.clip(lum, 0, 1)
+
+    img = np.empty((height, width, 3), np.float32)
+    img[:] = BACKDROP_COLOR
+    skin = lum[..., None] * np.array([0.75, 0.85, 1.0], np.float32) * 235
+    subject = (r2 < 1.25) & ((r2 < 1) | (v < -0.3))
+    img[subject] = skin[subject]
+    img[shoulders & ~subject] = (90, 60, 40)
+    img += rng.normal(0, 4, img.shape).astype(np.float32)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+def write_corpus(directory, sizes=None):
+    corpus = []
+    for label, width, height in CORPUS:
+        if sizes and label not in sizes:
+            continue
+        path = os.path.join(directory, f"portrait_{label}.jpg")
+        cv2.imwrite(path, synthetic_portrait(width, height), [cv2.IMWRITE_JPEG_QUALITY, 90])
+        corpus.append((label, width, height, path))
+    return corpus
+
+def stub_remove_background(source):
+    # Keys out the plain backdrop instead of running carvekit, the result is a BGRA cut-out like carvekit's
+    if isinstance(source, bytes):
+        img = cv2.imdecode(np.frombuffer(source, np.uint8), cv2.IMREAD_COLOR)
+    else:
+        img = cv2.imread(source, cv2.IMREAD_COLOR)
+
+    distance = np.abs(img.astype(np.int16) - np.array(BACKDROP_COLOR, np.int16)).max(axis=2)
+    mask = cv2.morphologyEx((distance > 24).astype(np.uint8) * 255, cv2.MORPH_OPEN, np.ones((5, 5), np.uint8))
+
+    cutout = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+    cutout[:, :, 3] = mask
+    # carvekit composites onto a transparent grey
+    cutout[mask == 0, :3] = 130
+    return cutout
+
+def install_stub_background_remover():
+    passport_photo_creator.remove_background = stub_remove_background
+    passport_photo_creator.get_background_remover = lambda: None
+
+def time_ms(function, *args, **kwargs):
+    started = time.perf_counter()
+    function(*args, **kwargs)
+    return (time.perf_counter() - started) * 1000
+
+def run_card(job):
+    # Pipeline progress messages would drown the report
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        generate_id_card(**job)
+
+def card_job(image, output, template, renderer):
+    return dict(CARD_FIELDS, template=template, image=image, output=output, renderer=renderer)
+
+def bench_stages(corpus, template, renderer, repeat, output_dir):
+    card_template = get_template(template)
+    results = []
+
+    for label, width, height, path in corpus:
+        img = stub_remove_background(path)
+        timings = {}
+
+        def add(name, ms):
+            timings.setdefault(name, []).append(ms)
+
+        face = tuple(passport_photo_creator.detect_faces(img)['face'])
+        passport_photo = passport_photo_creator.make_passport_photo(path)
+        photo_uri = embed_photo(passport_photo, card_template.photo_background)
+        values = dict(name=CARD_FIELDS['name'], code=CARD_FIELDS['code'], blood_group=f"Blood Group: {CARD_FIELDS['blood_group']}",
+                      photo=photo_uri, color=experience_color(CARD_FIELDS['experience']))
+
+        for _ in range(repeat):
+            add('face_detection', time_ms(passport_photo_creator.detect_faces, img))
+            add('crop_centered_head', time_ms(passport_photo_creator.crop_centered_head, img, face, 1.5))
+            add('make_passport_photo', time_ms(passport_photo_creator.make_passport_photo, path))
+            add('photo_embed', time_ms(embed_photo, passport_photo, card_template.photo_background))
+            add('svg_fill', time_ms(card_template.render, **values))
+
+            with MetricsRun('id_card') as run:
+                run_card(card_job(path, os.path.join(output_dir, f"card_{label}.pdf"), template, renderer))
+            for entry in run.stages:
+                add(f"card.{entry['stage']}", entry['wall_ms'])
+            add('card.total', run.to_dict()['total_ms'])
+
+        results.append({
+            'image': label,
+            'width': width,
+            'height': height,
+            'photo_uri_bytes': len(photo_uri),
+            'median_ms': {name: round(statistics.median(values), 2) for name, values in timings.items()},
+        })
+    return results
+
+def init_benchmark_worker(template):
+    install_stub_background_remover()
+    passport_photo_creator.get_face_cascade()
+    get_template(template)
+
+def bench_throughput(corpus, template, renderer, max_workers, cards, output_dir):
+    results = []
+    for workers in range(1, max_workers + 1):
+        jobs = [card_job(corpus[i % len(corpus)][3], os.path.join(output_dir, f"throughput_{i}.pdf"), template, renderer)
+                for i in range(cards)]
+
+        # Includes starting the pool, like a batch run of id_card_batch does
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_benchmark_worker, initargs=(template,)) as executor:
+            list(executor.map(run_card, jobs))
+        elapsed = time.perf_counter() - started
+
+        results.append({'workers': workers, 'cards': cards, 'seconds': round(elapsed, 2),
+                        'cards_per_minute': round(cards / elapsed * 60, 1)})
+    return results
+
+def print_report(stages, throughput):
+    names = []
+    for result in stages:
+        names += [name for name in result['median_ms'] if name not in names]
+
+    header = f"{'stage (median ms)':<32}" + ''.join(f"{result['image']:>10}" for result in stages)
+    print(header)
+    print('-' * len(header))
+    for name in names:
+        print(f"{name:<32}" + ''.join(f"{result['median_ms'].get(name, 0):>10.2f}" for result in stages))
+
+    if throughput:
+        print()
+        print(f"{'workers':>8}{'cards':>8}{'seconds':>10}{'cards/min':>12}")
+        for result in throughput:
+            print(f"{result['workers']:>8}{result['cards']:>8}{result['seconds']:>10.2f}{result['cards_per_minute']:>12.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the passport photo and identity card pipeline on synthetic portraits.')
+    parser.add_argument('-t', '--template', default=DEFAULT_TEMPLATE, required=False, help='Path to template.')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), required=False, help='Measure throughput for 1 up to this many worker processes (0 skips it).')
+    parser.add_argument('-n', '--repeat', type=int, default=3, required=False, help='Runs per image for the stage timings, the median is reported.')
+    parser.add_argument('-c', '--cards', type=int, default=20, required=False, help='Cards generated per throughput measurement.')
+    parser.add_argument('--sizes', nargs='+', choices=[label for label, _, _ in CORPUS], default=None, required=False, help='Only benchmark these corpus images.')
+    parser.add_argument('-R', '--renderer', choices=list(RENDERERS), default=None, required=False, help='SVG to PDF backend (defaults to $ID_CARD_RENDERER or inkscape)')
+    parser.add_argument('--json', default=None, required=False, help='Also write the results to this JSON file.')
+    args = parser.parse_args()
+
+    install_stub_background_remover()
+    template = os.path.abspath(args.template)
+
+    with tempfile.TemporaryDirectory(prefix='id-card-benchmark-') as work_dir:
+        corpus = write_corpus(work_dir, args.sizes)
+        stages = bench_stages(corpus, template, args.renderer, args.repeat, work_dir)
+        throughput = bench_throughput(corpus, template, args.renderer, args.workers, args.cards, work_dir)
+
+    print_report(stages, throughput)
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({'stages': stages, 'throughput': throughput}, file, indent=2)
+
+if __name__ == "__main__":
+    main()
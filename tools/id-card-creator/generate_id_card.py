@@ -1,14 +1,22 @@
 #!/usr/bin/env python3
-import argparse
+import io
 import os
 import base64
 import subprocess
-from passport_photo_creator import detect_and_center_head, resize_and_center_head
-import tempfile
+from passport_photo_creator import make_passport_photo, create_passport_photo, resize_to_fit, encode_png, encode_jpeg, flatten_onto, has_transparency, background_remover_signature, DETECTION_MAX_SIZE, PASSPORT_SIZE
+from photo_cache import get_cache, source_digest
+from pipeline_metrics import stage, record
+from id_card_template import get_template, experience_color
+from xml.sax.saxutils import escape
 from PIL import Image
 
+# JPEG quality of the photo embedded in the card
+PHOTO_JPEG_QUALITY = int(os.environ.get('ID_CARD_PHOTO_QUALITY', 90))
+
 def is_valid_image(image_path):
-    """Check if the given path is a valid image file."""
+    """Check if the given path (or encoded image bytes) is a valid image file."""
+    if isinstance(image_path, bytes):
+        image_path = io.BytesIO(image_path)
     try:
         with Image.open(image_path) as img:
             img.verify()
@@ -16,87 +24,152 @@ def is_valid_image(image_path):
     except (IOError, SyntaxError):
         return False
 
-def replace_in_file(filename, old_string, new_string):
-    with open(filename, 'r') as file:
-        file_data = file.read()
-        file_data = file_data.replace(old_string, new_string)
-
-    with open(filename, 'w') as file:
-        file.write(file_data)
-
-def main():
-    parser = argparse.ArgumentParser(description='Process inputs.')
-    parser.add_argument('-t', '--template', required=True, help='Path to template.')
-    parser.add_argument('-n', '--name', required=True, help='Employee Name.')
-    parser.add_argument('-e', '--code', required=True, help='Employee Code.')
-    parser.add_argument('-b', '--blood_group', required=True, help='Blood Group.')
-    parser.add_argument('-i', '--image', required=True, help='Path to Employee Image.')
-    parser.add_argument('-y', '--experience', required=True, type=float, help='Years of Experience.')
-    parser.add_argument('-r', '--head_to_face_ratio', type=float, default=1.5, required=False, help='Ratio of Head Size to the Face Size')
-    parser.add_argument('-o', '--output', required=True, help='Output PDF File Path.')
-
-    args = parser.parse_args()
-
-    if not os.path.exists(args.image) or not is_valid_image(args.image):
+def svg_to_pdf_cairosvg(svg):
+    # Opt-in (pip install cairosvg): it does not lay out Inkscape flowed text, e.g. the name field
+    # of the templates, which is drawn from its fallback position instead
+    import cairosvg
+
+    return cairosvg.svg2pdf(bytestring=svg.encode())
+
+def svg_to_pdf_inkscape(svg):
+    # Inkscape reads the SVG from stdin and writes the PDF to stdout, so no temp files are needed
+    result = subprocess.run(['inkscape', '--pipe', '--export-type=pdf', '--export-filename=-'],
+                            input=svg.encode(), capture_output=True, check=True)
+    return result.stdout
+
+RENDERERS = {
+    'cairosvg': svg_to_pdf_cairosvg,
+    'inkscape': svg_to_pdf_inkscape,
+}
+
+# The templates are authored in Inkscape, so it is the reference renderer
+DEFAULT_RENDERER = 'inkscape'
+
+def renderer_name(renderer=None):
+    renderer = renderer or os.environ.get('ID_CARD_RENDERER', DEFAULT_RENDERER)
+    if renderer not in RENDERERS:
+        raise ValueError(f"Unknown renderer: {renderer}")
+    return renderer
+
+def get_renderer(renderer=None):
+    return RENDERERS[renderer_name(renderer)]
+
+def merge_pdfs(front_pdf, back_pdf_reader):
+    from pypdf import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    writer.append(PdfReader(io.BytesIO(front_pdf)))
+    writer.append(back_pdf_reader)
+
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+def embed_photo(photo, background, quality=PHOTO_JPEG_QUALITY):
+    # A JPEG of the photo flattened onto the card is a fraction of the size of the RGBA PNG, which keeps
+    # the SVG small for the renderer and the PDF small on the media disk. PNG is only kept when the
+    # photo is transparent and the card under it is not a solid colour.
+    photo = resize_to_fit(photo, *PASSPORT_SIZE)
+    if not has_transparency(photo):
+        mime_type, data = 'image/jpeg', encode_jpeg(photo[:, :, :3], quality)
+    elif background is not None:
+        mime_type, data = 'image/jpeg', encode_jpeg(flatten_onto(photo, background), quality)
+    else:
+        mime_type, data = 'image/png', encode_png(photo)
+
+    record(photo_format=mime_type, photo_bytes=len(data))
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode()}"
+
+def render_id_card(template, name, code, blood_group, experience, photo, renderer=None):
+    card_template = get_template(template)
+
+    # Fit the passport photo to the card's photo box and inline it as a data URI
+    with stage('photo_embed'):
+        photo_uri = embed_photo(photo, card_template.photo_background)
+
+    # Fill every placeholder of the pre-parsed template in one pass
+    with stage('svg_fill'):
+        svg = card_template.render(name=escape(name),
+                                   code=escape(code),
+                                   blood_group=escape(f"Blood Group: {blood_group}"),
+                                   photo=photo_uri,
+                                   color=experience_color(experience))
+        record(svg_bytes=len(svg))
+
+    # Convert the SVG to PDF and append the back of the card
+    with stage('svg_to_pdf'):
+        front_pdf = get_renderer(renderer)(svg)
+    with stage('pdf_merge'):
+        card_pdf = merge_pdfs(front_pdf, card_template.get_back_pdf_reader())
+        record(pdf_bytes=len(card_pdf))
+
+    return card_pdf
+
+def build_id_card(template, name, code, blood_group, image, experience, head_to_face_ratio=1.5, passport_output=None, renderer=None):
+    if (not isinstance(image, bytes) and not os.path.exists(image)) or not is_valid_image(image):
         raise ValueError("The provided image path either does not exist or is not a valid image file.")
 
-    temp_png_file_0 = tempfile.mktemp(suffix='.png')
-    temp_png_file_1 = tempfile.mktemp(suffix='.png')
-    temp_png_file_2 = tempfile.mktemp(suffix='.png')
-
-    subprocess.run(["carvekit", "-i", args.image, "-o", f"{temp_png_file_0}"], check=True)
-
-    detect_and_center_head(temp_png_file_0, temp_png_file_1)
-    resize_and_center_head(temp_png_file_1, temp_png_file_2, args.head_to_face_ratio)
-
-    temp_svg = tempfile.mktemp(suffix='.svg')
-    temp_pdf = tempfile.mktemp(suffix='.pdf')
+    cache = get_cache()
+    with stage('digest'):
+        digest = source_digest(image) if cache is not None else None
 
-    # Copy the template SVG
-    os.system(f'cp {args.template}/Front.svg {temp_svg}')
-
-    # Replace placeholders
-    replace_in_file(temp_svg, "FirstName LastName", args.name)
-    replace_in_file(temp_svg, "NTE-000", args.code)
-    replace_in_file(temp_svg, "Blood Group: BG", f"Blood Group: {args.blood_group}")
-
-    # Resize image using mogrify
-    os.system(f'mogrify -resize 1200x1680 {temp_png_file_2}')
-
-    # Convert image to base64
-    with open(temp_png_file_2, "rb") as image_file:
-        image_base64 = base64.b64encode(image_file.read()).decode()
-
-    replace_in_file(temp_svg, "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNc+R8AAlcBqugYjdEAAAAASUVORK5CYII=", image_base64)
-
-    # Replace color based on years of experience
-    if 0 <= args.experience <= 1.25:
-        color = "0068FF"
-    elif 1.25 < args.experience <= 2.5:
-        color = "B2B2B2"
-    elif 2.5 < args.experience <= 5:
-        color = "CC0000"
-    elif 5 < args.experience <= 8.5:
-        color = "D8C5A3"
+    if cache is not None:
+        card_key = cache.key(digest, background_remover_signature(), head_to_face_ratio, DETECTION_MAX_SIZE, PASSPORT_SIZE, name, code, blood_group,
+                             experience_color(experience), get_template(template).signature(), renderer_name(renderer),
+                             PHOTO_JPEG_QUALITY)
+        with stage('card_cache'):
+            card_pdf = cache.get('card', card_key)
     else:
-        color = "000000"
+        card_pdf = None
 
-    replace_in_file(temp_svg, "12b72b", color)
+    # Background removal, centering and cropping run once, the passport photo feeds the card
+    if passport_output is None:
+        passport_photo = make_passport_photo(image, head_to_face_ratio, digest) if card_pdf is None else None
+    else:
+        passport_photo = create_passport_photo(image, passport_output, head_to_face_ratio, digest)
+
+    if card_pdf is None:
+        card_pdf = render_id_card(template, name, code, blood_group, experience, passport_photo, renderer)
+        if cache is not None:
+            cache.put('card', card_key, card_pdf)
+
+    return card_pdf
+
+def render_card(job):
+    """
+    Renders the identity card described by job and returns the PDF.
+
+    job holds the arguments of generate_id_card, without output and passport_output: a call writes
+    no files besides the shared photo cache, only its own buffers, while the models, templates and
+    cache it shares with other calls are read-only or guarded by locks. Several cards can therefore
+    be rendered at once from a ThreadPoolExecutor, and as OpenCV, the image codecs and the SVG
+    renderer release the GIL, one process uses several cores.
+    """
+    if job.get('passport_output') is not None:
+        raise ValueError("render_card does not write the passport photo, use generate_id_card for passport_output.")
+    return build_id_card(**job)
+
+def generate_id_card(template, name, code, blood_group, image, experience, output, head_to_face_ratio=1.5, passport_output=None, renderer=None):
+    job = dict(template=template, name=name, code=code, blood_group=blood_group, image=image, experience=experience,
+               head_to_face_ratio=head_to_face_ratio, renderer=renderer)
+    if passport_output is None:
+        card_pdf = render_card(job)
+    else:
+        # The passport photo is written on the way, which render_card leaves out
+        card_pdf = build_id_card(passport_output=passport_output, **job)
 
-    # Convert SVG to PDF using Inkscape
-    os.system(f'inkscape {temp_svg} --export-type=pdf --export-filename={temp_pdf}')
+    with stage('write_output'), open(output, 'wb') as file:
+        file.write(card_pdf)
 
-    # Combine the two PDFs
-    os.system(f'pdftk {temp_pdf} {args.template}/Back.pdf cat output {args.output}')
-    print(f"Process complete. Output available at: {args.output}")
+    print(f"Process complete. Output available at: {output}")
+    if passport_output is not None:
+        print(f"Passport photo available at: {passport_output}")
 
-    # Cleanup temp files
-    os.remove(temp_svg)
-    os.remove(temp_pdf)
+def main():
+    # The CLI lives in id_card_cli, which only loads this module when no worker answers
+    from id_card_cli import id_card_main
 
-    os.remove(temp_png_file_0)
-    os.remove(temp_png_file_1)
-    os.remove(temp_png_file_2)
+    id_card_main()
 
 if __name__ == "__main__":
     main()
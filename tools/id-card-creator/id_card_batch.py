@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Regenerates identity cards for a whole list of employees, e.g. after a template change.
+
+The manifest is a CSV file (with a header row) or a JSON-lines file with one employee per
+row/line and the fields:
+
+    name, code, blood_group, experience, image, output[, head_to_face_ratio][, passport_output]
+
+Relative image and output paths are resolved against the manifest's directory.
+
+Usage:
+    id_card_batch -t templates/HyScaler_ID_Card_2023 -m employees.csv -w 4 -c all_cards.pdf
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+def read_manifest(manifest_path):
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+
+    with open(manifest_path, 'r', newline='') as file:
+        if manifest_path.lower().endswith('.csv'):
+            rows = list(csv.DictReader(file))
+        else:
+            rows = [json.loads(line) for line in file if line.strip()]
+
+    jobs = []
+    for row in rows:
+        job = {
+            'name': row['name'],
+            'code': row['code'],
+            'blood_group': row['blood_group'],
+            'experience': float(row.get('experience') or 0),
+            'image': os.path.join(base_dir, row['image']),
+            'output': os.path.join(base_dir, row['output']),
+        }
+        if row.get('head_to_face_ratio'):
+            job['head_to_face_ratio'] = float(row['head_to_face_ratio'])
+        if row.get('passport_output'):
+            job['passport_output'] = os.path.join(base_dir, row['passport_output'])
+        jobs.append(job)
+    return jobs
+
+def init_worker(template):
+    # Every pool process loads the models and parses the template once, then reuses them for all its cards
+    from passport_photo_creator import get_background_remover, get_face_cascade
+    from id_card_template import get_template
+
+    get_face_cascade()
+    get_background_remover()
+    get_template(template)
+
+def run_job(job):
+    from generate_id_card import generate_id_card
+
+    try:
+        generate_id_card(**job)
+        return job['output'], None
+    except Exception as e:
+        return job['output'], f"{type(e).__name__}: {e}"
+
+def combine_cards(card_paths, output):
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for card_path in card_paths:
+        writer.append(card_path)
+    writer.write(output)
+
+def generate_batch(template, jobs, workers=None, combined_output=None, renderer=None):
+    template = os.path.abspath(template)
+    jobs = [dict(job, template=template, renderer=renderer) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(template,)) as executor:
+        # map() keeps the manifest order, so the combined PDF is stable no matter which card finishes first
+        results = list(executor.map(run_job, jobs))
+
+    if combined_output:
+        combine_cards([output for output, error in results if error is None], combined_output)
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate identity cards for every employee in a manifest.')
+    parser.add_argument('-t', '--template', required=True, help='Path to template.')
+    parser.add_argument('-m', '--manifest', required=True, help='CSV or JSON-lines file listing the employees.')
+    parser.add_argument('-w', '--workers', type=int, default=None, required=False, help='Number of worker processes (defaults to the number of CPUs).')
+    parser.add_argument('-c', '--combined_output', default=None, required=False, help='Also write every card into this single print-ready PDF.')
+    parser.add_argument('-R', '--renderer', choices=['inkscape', 'cairosvg'], default=None, required=False, help='SVG to PDF backend (defaults to $ID_CARD_RENDERER or inkscape)')
+    args = parser.parse_args()
+
+    results = generate_batch(args.template, read_manifest(args.manifest), args.workers, args.combined_output, args.renderer)
+
+    failures = 0
+    for output, error in results:
+        if error is None:
+            print(f"Generated {output}")
+        else:
+            failures += 1
+            print(f"Failed {output}: {error}", file=sys.stderr)
+
+    print(f"Process complete. {len(results) - failures} of {len(results)} cards generated.")
+    if args.combined_output:
+        print(f"Combined cards available at: {args.combined_output}")
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Command line clients of the passport photo and identity card tools.
+
+The CLIs hand their job to a running id_card_worker and only fall back to doing the work in this
+process when none answers. Everything up to that point uses the standard library, so a call served
+by the worker never pays for importing OpenCV, numpy or PIL.
+
+Usage:
+    id_card_cli.py passport_photo_creator -i photo.jpg -o passport.png
+    id_card_cli.py generate_id_card -t templates/HyScaler_ID_Card_2023 -n ... -o card.pdf
+"""
+import argparse
+import base64
+import contextlib
+import json
+import os
+import sys
+from id_card_worker import submit_job, WorkerJobError
+from pipeline_metrics import MetricsRun, stage, emit
+
+# Keys of generate_id_card.RENDERERS, which is not imported to keep the client light
+RENDERER_NAMES = ('inkscape', 'cairosvg')
+
+def parse_ratios(spec):
+    # Either a comma separated list ("1.4,1.5,1.6") or an inclusive range ("1.3:1.8:0.05")
+    if ':' in spec:
+        start, stop, step = (float(v) for v in spec.split(':'))
+        count = int(round((stop - start) / step)) + 1
+        return [round(start + i * step, 4) for i in range(count)]
+    return [float(v) for v in spec.split(',')]
+
+def write_stream(data, fd=None):
+    # Writes to stdout, or to a file descriptor the caller passed down
+    if fd is None:
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+    else:
+        with os.fdopen(fd, 'wb') as stream:
+            stream.write(data)
+
+@contextlib.contextmanager
+def local_job():
+    # A job run in this process fails like the same job on the worker, so both are reported alike
+    from passport_photo_creator import NoFaceDetectedError, EXIT_NO_FACE
+
+    try:
+        yield
+    except NoFaceDetectedError as e:
+        raise WorkerJobError({'ok': False, 'error': str(e), 'exit_code': EXIT_NO_FACE, 'detection': e.detection})
+
+def run_job(command, job, socket_path, run_locally, metrics_file):
+    # Hand the job to the long-running worker when one is up, otherwise do the work in this process
+    run = MetricsRun(command)
+    response = None
+    try:
+        with run:
+            response = submit_job(command, job, socket_path)
+            if response is None:
+                with local_job():
+                    run_locally()
+        return response
+    except WorkerJobError as e:
+        response = e.response
+        print(json.dumps({'error': str(e), **e.response.get('detection', {})}), file=sys.stderr)
+        sys.exit(e.response.get('exit_code', 1))
+    finally:
+        # Jobs run by the worker are measured there
+        emit(response['metrics'] if response and 'metrics' in response else run.to_dict(), metrics_file)
+
+def passport_photo_main(argv=None):
+    parser = argparse.ArgumentParser(description='Crop the image based on head position and size.')
+    parser.add_argument('-i', '--input', required=True, help='Path to input image, "-" reads the encoded image from stdin')
+    parser.add_argument('-o', '--output', default=None, required=False, help='Path to save processed image, "-" writes the PNG to stdout')
+    parser.add_argument('--output_fd', type=int, default=None, required=False, help='Write the PNG to this inherited file descriptor instead of --output')
+    parser.add_argument('-r', '--head_to_face_ratio', type=float, default=1.5, required=False, help='Ratio of Head Size to the Face Size')
+    parser.add_argument('-P', '--preview', default=None, required=False, help='Write a contact sheet of crops for these ratios instead, e.g. "1.3:1.8:0.05" or "1.4,1.5,1.6"')
+    parser.add_argument('-s', '--socket', default=None, required=False, help='Unix socket of a running id_card_worker (defaults to $ID_CARD_WORKER_SOCKET)')
+    parser.add_argument('--metrics-file', '--metrics_file', dest='metrics_file', default=None, required=False, help='Append the run metrics JSON line to this file instead of stderr')
+    args = parser.parse_args(argv)
+
+    if args.output is None and args.output_fd is None:
+        parser.error('one of -o/--output or --output_fd is required')
+
+    streaming = args.output == '-' or args.output_fd is not None
+    source = sys.stdin.buffer.read() if args.input == '-' else os.path.abspath(args.input)
+
+    job = {}
+    if isinstance(source, bytes):
+        job['input_base64'] = base64.b64encode(source).decode()
+    else:
+        job['input'] = source
+    if not streaming:
+        job['output'] = os.path.abspath(args.output)
+
+    if args.preview:
+        command = 'passport_preview'
+        job['ratios'] = parse_ratios(args.preview)
+    else:
+        command = 'passport_photo'
+        job['head_to_face_ratio'] = args.head_to_face_ratio
+
+    result = {}
+
+    def run_locally():
+        from passport_photo_creator import passport_photo_png, preview_sheet_png
+
+        # Progress messages must not end up in the PNG written to stdout
+        with contextlib.redirect_stdout(sys.stderr) if streaming else contextlib.nullcontext():
+            if args.preview:
+                data = preview_sheet_png(source, job['ratios'])
+            else:
+                data = passport_photo_png(source, args.head_to_face_ratio)[1]
+        if streaming:
+            result['data'] = data
+        else:
+            with stage('write_output'), open(job['output'], 'wb') as file:
+                file.write(data)
+
+    response = run_job(command, job, args.socket, run_locally, args.metrics_file)
+
+    if streaming:
+        write_stream(base64.b64decode(response['output_base64']) if response else result['data'], args.output_fd)
+
+def id_card_main(argv=None):
+    parser = argparse.ArgumentParser(description='Process inputs.')
+    parser.add_argument('-t', '--template', required=True, help='Path to template.')
+    parser.add_argument('-n', '--name', required=True, help='Employee Name.')
+    parser.add_argument('-e', '--code', required=True, help='Employee Code.')
+    parser.add_argument('-b', '--blood_group', required=True, help='Blood Group.')
+    parser.add_argument('-i', '--image', required=True, help='Path to Employee Image, "-" reads the encoded image from stdin.')
+    parser.add_argument('-y', '--experience', required=True, type=float, help='Years of Experience.')
+    parser.add_argument('-r', '--head_to_face_ratio', type=float, default=1.5, required=False, help='Ratio of Head Size to the Face Size')
+    parser.add_argument('-o', '--output', required=True, help='Output PDF File Path.')
+    parser.add_argument('-p', '--passport_output', default=None, required=False, help='Also save the passport photo used on the card to this PNG File Path.')
+    parser.add_argument('-R', '--renderer', choices=RENDERER_NAMES, default=None, required=False, help='SVG to PDF backend (defaults to $ID_CARD_RENDERER or inkscape)')
+    parser.add_argument('-s', '--socket', default=None, required=False, help='Unix socket of a running id_card_worker (defaults to $ID_CARD_WORKER_SOCKET)')
+    parser.add_argument('--metrics-file', '--metrics_file', dest='metrics_file', default=None, required=False, help='Append the run metrics JSON line to this file instead of stderr')
+    args = parser.parse_args(argv)
+
+    image = sys.stdin.buffer.read() if args.image == '-' else os.path.abspath(args.image)
+
+    job = {
+        'template': os.path.abspath(args.template),
+        'name': args.name,
+        'code': args.code,
+        'blood_group': args.blood_group,
+        'experience': args.experience,
+        'output': os.path.abspath(args.output),
+        'head_to_face_ratio': args.head_to_face_ratio,
+        'passport_output': os.path.abspath(args.passport_output) if args.passport_output else None,
+        'renderer': args.renderer,
+    }
+
+    if isinstance(image, bytes):
+        worker_job = dict(job, image_base64=base64.b64encode(image).decode())
+    else:
+        worker_job = dict(job, image=image)
+
+    def run_locally():
+        from generate_id_card import generate_id_card
+
+        generate_id_card(image=image, **job)
+
+    if run_job('id_card', worker_job, args.socket, run_locally, args.metrics_file) is not None:
+        print(f"Process complete. Output available at: {args.output}")
+        if args.passport_output:
+            print(f"Passport photo available at: {args.passport_output}")
+
+COMMANDS = {
+    'passport_photo_creator': passport_photo_main,
+    'generate_id_card': id_card_main,
+}
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        sys.exit(f"usage: {os.path.basename(sys.argv[0])} {{{','.join(COMMANDS)}}} [options]")
+    COMMANDS[sys.argv[1]](sys.argv[2:])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+import io
+import os
+import re
+import threading
+
+# Placeholder text in the template's Front.svg, keyed by the value that replaces it
+PLACEHOLDERS = {
+    'name': "FirstName LastName",
+    'code': "NTE-000",
+    'blood_group': "Blood Group: BG",
+    'photo': "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNc+R8AAlcBqugYjdEAAAAASUVORK5CYII=",
+    'color': "12b72b",
+}
+
+# Card colour by years of experience: the first band whose upper bound (inclusive) is not exceeded,
+# anything else (including negative values) is EXPERIENCE_DEFAULT_COLOR
+EXPERIENCE_COLORS = [
+    (1.25, "0068FF"),
+    (2.5, "B2B2B2"),
+    (5, "CC0000"),
+    (8.5, "D8C5A3"),
+]
+EXPERIENCE_DEFAULT_COLOR = "000000"
+
+# (B, G, R) colour of the card under the photo, transparent photos are flattened onto it
+PHOTO_BACKGROUND = (255, 255, 255)
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+def experience_color(experience):
+    if experience >= 0:
+        for upper_bound, color in EXPERIENCE_COLORS:
+            if experience <= upper_bound:
+                return color
+    return EXPERIENCE_DEFAULT_COLOR
+
+def bake(chunks, slots, values):
+    # Merges the given slot values into the static chunks, the remaining slots stay open
+    baked_chunks = [chunks[0]]
+    baked_slots = []
+    for slot, chunk in zip(slots, chunks[1:]):
+        if slot in values:
+            baked_chunks[-1] += values[slot] + chunk
+        else:
+            baked_slots.append(slot)
+            baked_chunks.append(chunk)
+    return baked_chunks, baked_slots
+
+class IdCardTemplate:
+    """
+    The render plan of an identity card template, compiled once.
+
+    The SVG is split around every placeholder and the card colour of every experience band is
+    baked into its own copy of the static chunks, so rendering a card is a single join of those
+    chunks with the employee's name, code, blood group and photo.
+    """
+
+    def __init__(self, template_dir):
+        self.template_dir = template_dir
+        self.front_svg = os.path.join(template_dir, 'Front.svg')
+        self.back_pdf = os.path.join(template_dir, 'Back.pdf')
+        # None keeps the photo's alpha channel, for templates whose photo sits on a pattern
+        self.photo_background = PHOTO_BACKGROUND
+        self._back_pdf_data = None
+        self._back_pdf_readers = threading.local()
+
+        # Taken before reading, so a template edited while compiling is recompiled on the next card
+        self.compiled_signature = self.signature()
+
+        with open(self.front_svg, 'r') as file:
+            svg = file.read()
+
+        slot_names = {placeholder: name for name, placeholder in PLACEHOLDERS.items()}
+        pattern = re.compile('|'.join(re.escape(placeholder) for placeholder in PLACEHOLDERS.values()))
+
+        self.chunks = []
+        self.slots = []
+        position = 0
+        for match in pattern.finditer(svg):
+            self.chunks.append(svg[position:match.start()])
+            self.slots.append(slot_names[match.group()])
+            position = match.end()
+        self.chunks.append(svg[position:])
+
+        missing = set(PLACEHOLDERS) - set(self.slots)
+        if missing:
+            raise ValueError(f"Template {template_dir} is missing the placeholders for: {', '.join(sorted(missing))}")
+
+        colors = [color for _, color in EXPERIENCE_COLORS] + [EXPERIENCE_DEFAULT_COLOR]
+        self.variants = {color: bake(self.chunks, self.slots, {'color': color}) for color in colors}
+
+    def render(self, **values):
+        # Colours outside the experience bands are filled like any other placeholder
+        chunks, slots = self.variants.get(values.get('color'), (self.chunks, self.slots))
+        parts = [chunks[0]]
+        for slot, chunk in zip(slots, chunks[1:]):
+            parts.append(values[slot])
+            parts.append(chunk)
+        return ''.join(parts)
+
+    def is_stale(self):
+        try:
+            return self.signature() != self.compiled_signature
+        except FileNotFoundError:
+            return True
+
+    def signature(self):
+        # Identifies the template files a rendered card was built from
+        return [(path, os.stat(path).st_mtime_ns) for path in (self.front_svg, self.back_pdf)]
+
+    def get_back_pdf_reader(self):
+        # Back.pdf is identical for every card, so it is parsed once and its pages appended from memory.
+        # A reader seeks around its stream while pages are copied, so every thread gets its own.
+        reader = getattr(self._back_pdf_readers, 'reader', None)
+        if reader is None:
+            from pypdf import PdfReader
+
+            if self._back_pdf_data is None:
+                with open(self.back_pdf, 'rb') as file:
+                    self._back_pdf_data = file.read()
+            reader = self._back_pdf_readers.reader = PdfReader(io.BytesIO(self._back_pdf_data))
+        return reader
+
+def get_template(template_dir):
+    # Render plans are compiled once per directory and reused for every card the process renders,
+    # until the template files are modified
+    template_dir = os.path.abspath(template_dir)
+    with _templates_lock:
+        template = _templates.get(template_dir)
+        if template is None or template.is_stale():
+            template = _templates[template_dir] = IdCardTemplate(template_dir)
+        return template
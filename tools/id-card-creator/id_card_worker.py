@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Long-running worker for the passport photo and identity card tools.
+
+Starting Python, OpenCV and the carvekit models dominates the time spent on a
+single photo, so the worker loads them once and then serves jobs until it is
+stopped. Jobs are JSON objects, one per line:
+
+    {"id": 1, "command": "passport_photo", "args": {"input": "...", "output": "...", "head_to_face_ratio": 1.5}}
+    {"id": 2, "command": "id_card", "args": {"template": "...", "name": "...", ...}}
+    {"id": 3, "command": "passport_preview", "args": {"input": "...", "output": "...", "ratios": [1.4, 1.5, 1.6]}}
+
+and every job is answered with one JSON line:
+
+    {"id": 1, "ok": true, "output": "...", "metrics": {...}}
+    {"id": 2, "ok": false, "error": "...", "exit_code": 1, "metrics": {...}}
+
+"metrics" holds the per-stage timings of the job (see pipeline_metrics.py).
+
+Inputs may be sent inline as "input_base64" ("image_base64" for id_card) instead of a path, and
+passport jobs without an "output" path answer with the PNG in "output_base64".
+
+Usage:
+    # Serve jobs over a Unix socket (the CLIs pick it up from $ID_CARD_WORKER_SOCKET),
+    # running up to 4 of them at once on separate threads
+    id_card_worker --socket /run/id-card-worker.sock --threads 4
+
+    # Serve jobs from stdin, answering on stdout
+    id_card_worker --stdin
+"""
+import argparse
+import base64
+import contextlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), 'id-card-worker.sock')
+
+_handlers = None
+
+class WorkerJobError(RuntimeError):
+    def __init__(self, response):
+        super().__init__(response.get('error'))
+        self.response = response
+
+def socket_path_from_env(socket_path=None):
+    return socket_path or os.environ.get('ID_CARD_WORKER_SOCKET') or DEFAULT_SOCKET_PATH
+
+def job_source(args, key='input'):
+    # Streamed inputs travel base64 encoded as <key>_base64, everything else as a path
+    if f'{key}_base64' in args:
+        return base64.b64decode(args.pop(f'{key}_base64'))
+    return args.pop(key)
+
+def run_to_output(args, produce):
+    data = produce(job_source(args))
+
+    # Without an output path the PNG goes back to the client in the response
+    if not args.get('output'):
+        return {'output_base64': base64.b64encode(data).decode()}
+
+    with open(args['output'], 'wb') as file:
+        file.write(data)
+    return {}
+
+def run_id_card(args):
+    from generate_id_card import generate_id_card
+
+    generate_id_card(image=job_source(args, 'image'), **args)
+    return {}
+
+def load_handlers():
+    # Imported lazily so the CLIs can use submit_job() without pulling in the models
+    global _handlers
+    if _handlers is None:
+        from passport_photo_creator import passport_photo_png, preview_sheet_png, get_background_remover, get_face_cascade
+
+        get_face_cascade()
+        get_background_remover()
+
+        _handlers = {
+            'passport_photo': lambda args: run_to_output(args, lambda source: passport_photo_png(source, args.get('head_to_face_ratio', 1.5))[1]),
+            'passport_preview': lambda args: run_to_output(args, lambda source: preview_sheet_png(source, args['ratios'])),
+            'id_card': run_id_card,
+        }
+    return _handlers
+
+def handle_job(job):
+    from passport_photo_creator import NoFaceDetectedError, EXIT_NO_FACE
+    from pipeline_metrics import MetricsRun
+
+    response = {'id': job.get('id')}
+    run = MetricsRun(job.get('command'))
+    try:
+        handler = load_handlers().get(job.get('command'))
+        if handler is None:
+            raise ValueError(f"Unknown command: {job.get('command')}")
+        args = dict(job.get('args', {}))
+        with run:
+            result = handler(args)
+        response['ok'] = True
+        response['output'] = args.get('output')
+        response.update(result)
+    except NoFaceDetectedError as e:
+        # Bad uploads are rejected with the detection result so the client can report it
+        response['ok'] = False
+        response['error'] = str(e)
+        response['exit_code'] = EXIT_NO_FACE
+        response['detection'] = e.detection
+    except Exception as e:
+        response['ok'] = False
+        response['error'] = f"{type(e).__name__}: {e}"
+        response['exit_code'] = 1
+    response['metrics'] = run.to_dict()
+    return response
+
+def iter_responses(lines):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            response = {'id': None, 'ok': False, 'error': f"Invalid job: {e}"}
+        else:
+            response = handle_job(job)
+        yield json.dumps(response) + '\n'
+
+class JobRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for response in iter_responses(line.decode() for line in self.rfile):
+            self.wfile.write(response.encode())
+
+class JobServer(socketserver.UnixStreamServer):
+    # Connections are served by a fixed pool of `threads` long-lived threads, further connections
+    # wait for a free one. The models are loaded once and shared by all of them, and the per-thread
+    # Haar cascades and Back.pdf readers are only built once per pool thread, not once per job.
+    def __init__(self, socket_path, threads):
+        super().__init__(socket_path, JobRequestHandler)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='id-card-job')
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def serve_socket(socket_path, threads=None):
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    load_handlers()
+    with JobServer(socket_path, threads or os.cpu_count() or 1) as server:
+        print(f"Worker ready on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(socket_path)
+
+def serve_stdin():
+    load_handlers()
+    stdout = sys.stdout
+    # The tools print progress messages, keep them off the response stream
+    with contextlib.redirect_stdout(sys.stderr):
+        for response in iter_responses(sys.stdin):
+            stdout.write(response)
+            stdout.flush()
+
+def submit_job(command, args, socket_path=None):
+    """
+    Sends a job to a running worker and waits for the result.
+    Returns None when no worker is listening, so the caller can run the job itself.
+    """
+    socket_path = socket_path_from_env(socket_path)
+    if not os.path.exists(socket_path):
+        return None
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except OSError:
+        client.close()
+        return None
+
+    with client, client.makefile('rwb') as stream:
+        stream.write((json.dumps({'id': os.getpid(), 'command': command, 'args': args}) + '\n').encode())
+        stream.flush()
+        line = stream.readline()
+
+    if not line:
+        raise RuntimeError("The worker closed the connection without answering.")
+
+    response = json.loads(line)
+    if not response.get('ok'):
+        raise WorkerJobError(response)
+    return response
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve passport photo and identity card jobs from a single process.')
+    parser.add_argument('-s', '--socket', default=None, required=False, help='Unix socket to listen on (defaults to $ID_CARD_WORKER_SOCKET)')
+    parser.add_argument('--stdin', action='store_true', help='Read jobs from stdin and answer on stdout instead of listening on a socket')
+    parser.add_argument('-j', '--threads', type=int, default=None, required=False, help='Jobs run concurrently on the socket (defaults to the number of CPUs)')
+    args = parser.parse_args()
+
+    if args.stdin:
+        serve_stdin()
+    else:
+        serve_socket(socket_path_from_env(args.socket), args.threads)
+
+if __name__ == "__main__":
+    main()
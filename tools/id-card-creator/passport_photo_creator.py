@@ -1,70 +1,139 @@
 #!/usr/bin/env python3
 import cv2
-import argparse
-import subprocess
+import functools
+import importlib.metadata
+import io
+import math
 import numpy as np
 import os
-import tempfile
-
-def detect_and_center_head(image_path, output_path):
-    # Load the cascade classifier for detecting faces
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-
-    # Load the image
-    img = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)  # Make sure we're preserving any alpha channel
-
+import json
+import threading
+import time
+from PIL import Image
+from photo_cache import get_cache, source_digest
+from pipeline_metrics import stage, record
+
+HAAR_CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+
+# Longest side, in pixels, of the image the cascade runs on (0 detects on the full resolution image)
+DETECTION_MAX_SIZE = int(os.environ.get('ID_CARD_DETECTION_MAX_SIZE', 640))
+
+# Final (width, height) of the passport photo, also the photo box of the identity card
+PASSPORT_SIZE = (1200, 1680)
+
+# Exit code of the CLIs when the photo has no detectable face
+EXIT_NO_FACE = 3
+
+# carvekit settings, the same defaults as the `carvekit` CLI
+BACKGROUND_REMOVER_SETTINGS = {
+    'object_type': "object",
+    'batch_size_seg': 5,
+    'batch_size_matting': 1,
+    'seg_mask_size': 640,
+    'matting_mask_size': 2048,
+    'trimap_prob_threshold': 231,
+    'trimap_dilation': 30,
+    'trimap_erosion_iters': 5,
+    'fp16': False,
+}
+
+_face_cascade = threading.local()
+_background_remover = None
+_background_remover_lock = threading.Lock()
+
+class NoFaceDetectedError(ValueError):
+    def __init__(self, detection):
+        super().__init__("No face detected in the provided image.")
+        self.detection = detection
+
+def get_face_cascade():
+    # Parsing the cascade XML is slow, so a classifier is kept for the life of the process. Detection
+    # keeps per-image state in the classifier, so every thread gets its own.
+    cascade = getattr(_face_cascade, 'classifier', None)
+    if cascade is None:
+        cascade = _face_cascade.classifier = cv2.CascadeClassifier(HAAR_CASCADE_PATH)
+    return cascade
+
+def get_background_remover():
+    # Loading carvekit pulls in torch and the segmentation/matting weights, so only do it once.
+    # Inference does not modify the models, so all threads share them.
+    global _background_remover
+    with _background_remover_lock:
+        if _background_remover is None:
+            import torch
+            from carvekit.api.high import HiInterface
+
+            _background_remover = HiInterface(device='cuda' if torch.cuda.is_available() else 'cpu',
+                                              **BACKGROUND_REMOVER_SETTINGS)
+    return _background_remover
+
+@functools.lru_cache(maxsize=None)
+def background_remover_signature():
+    # Part of the cache key of every cut-out and of everything made from one, so upgrading carvekit
+    # or changing its settings does not serve cut-outs of the old model
+    try:
+        version = importlib.metadata.version('carvekit')
+    except importlib.metadata.PackageNotFoundError:
+        version = None
+    return {'carvekit': version, **BACKGROUND_REMOVER_SETTINGS}
+
+def remove_background(source):
+    # carvekit takes a path or a PIL image, so encoded bytes (e.g. streamed on stdin) are opened in memory
+    if isinstance(source, bytes):
+        source = Image.open(io.BytesIO(source))
+
+    # The cut-out comes back as a BGRA array, its alpha channel is the carvekit mask
+    cutout = get_background_remover()([source])[0]
+    return cv2.cvtColor(np.asarray(cutout.convert('RGBA')), cv2.COLOR_RGBA2BGRA)
+
+def to_bgra(img):
     # If the image is 3-channel (no alpha), we add an alpha channel
     if img.shape[2] == 3:
         img = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+    return img
+
+def detect_faces(img, scale_factor=1.3, min_neighbors=5, max_size=None):
+    # Returns the detection as a plain dict: face count, chosen face, its confidence and the time taken
+    started = time.perf_counter()
+    if max_size is None:
+        max_size = DETECTION_MAX_SIZE
+
+    gray = cv2.cvtColor(to_bgra(img), cv2.COLOR_BGRA2GRAY)
 
-    gray = cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+    # Haar detection time grows with the pixel count, so run it on a bounded size copy
+    height, width = gray.shape
+    scale = 1.0
+    if max_size and max(height, width) > max_size:
+        scale = max_size / max(height, width)
+        gray = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
 
-    # Detect the face in the image
-    faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+    # Detect the faces in the image, the level weights serve as the detection confidence
+    faces, _, weights = get_face_cascade().detectMultiScale3(gray, scale_factor, min_neighbors, outputRejectLevels=True)
 
-    if len(faces) == 0:
-        print("No face detected!")
-        return
+    detection = {'face_count': len(faces), 'face': None, 'confidence': None}
+    if len(faces) > 0:
+        # Group photos and false positives in the background are common, the subject is the largest face
+        chosen = max(range(len(faces)), key=lambda i: faces[i][2] * faces[i][3])
+        detection['face'] = [int(round(v / scale)) for v in faces[chosen]]
+        detection['confidence'] = round(float(weights[chosen]), 3)
 
-    # For simplicity, we'll consider only the first detected face
-    x, y, w, h = faces[0]
+    detection['detection_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return detection
+
+def center_offset(shape, face):
+    x, y, w, h = face
 
     # Get the center of the face
     face_center = (x + w//2, y + h//2)
 
     # Calculate the translation needed to center the face
-    height, width, _ = img.shape
+    height, width = shape[:2]
     dx = width//2 - face_center[0]
     dy = height//2 - face_center[1]
+    return dx, dy
 
-    # Create the translation matrix
-    M = np.float32([[1, 0, dx], [0, 1, dy]])
-
-    # Translate the image to center the face
-    centered_img = cv2.warpAffine(img, M, (width, height), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=(0,0,0,0))
-    # The borderValue=(0,0,0,0) makes sure that the new regions in the image are transparent.
-
-    # Save the output image in PNG format to preserve transparency
-    cv2.imwrite(output_path, centered_img)
-
-def resize_and_center_head(image_path, output_path, head_to_face_ratio=1.5):
-    # Load the image and the face detector
-    image = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
-
-    # Ensure the image has an alpha channel for transparency
-    if image.shape[2] == 3:
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
-
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-
-    # Detect faces
-    faces = face_cascade.detectMultiScale(image, 1.1, 4)
-    if len(faces) == 0:
-        print("No face detected in the image.")
-        return
-
-    # For simplicity, consider the first detected face
-    x, y, w, h = faces[0]
+def crop_window(shape, face, head_to_face_ratio=1.5):
+    x, y, w, h = face
 
     # Estimate the head height to be 1.5 times the face height
     estimated_head_height = int(head_to_face_ratio * h)
@@ -75,8 +144,8 @@ def resize_and_center_head(image_path, output_path, head_to_face_ratio=1.5):
 
     # Clip values to stay within image bounds
     y = max(0, y)
-    h = min(image.shape[0] - y, estimated_head_height)
-    w = min(image.shape[1] - x, w)
+    h = min(shape[0] - y, estimated_head_height)
+    w = min(shape[1] - x, w)
 
     # Calculate the new cropping window dimensions
     target_img_height = int(1.43 * estimated_head_height)
@@ -87,33 +156,294 @@ def resize_and_center_head(image_path, output_path, head_to_face_ratio=1.5):
     start_x = max(0, x - (target_img_width - w) // 2)
 
     # Adjust end points if they go beyond image dimensions
-    end_y = min(image.shape[0], start_y + target_img_height)
-    end_x = min(image.shape[1], start_x + target_img_width)
+    end_y = min(shape[0], start_y + target_img_height)
+    end_x = min(shape[1], start_x + target_img_width)
 
     # Ensure start_y remains non-negative
     start_y = max(0, start_y)
 
+    return start_x, start_y, end_x, end_y
+
+def extract_roi(image, start_x, start_y, end_x, end_y):
+    # Slice the window out of the image, padding with transparent pixels where it leaves the frame
+    height, width = image.shape[:2]
+    roi = np.zeros((max(0, end_y - start_y), max(0, end_x - start_x), image.shape[2]), dtype=image.dtype)
+
+    src_x0, src_y0 = max(0, start_x), max(0, start_y)
+    src_x1, src_y1 = min(width, end_x), min(height, end_y)
+    if src_x0 < src_x1 and src_y0 < src_y1:
+        roi[src_y0 - start_y:src_y1 - start_y, src_x0 - start_x:src_x1 - start_x] = image[src_y0:src_y1, src_x0:src_x1]
+    return roi
+
+def detect_and_center_head(img, face=None):
+    img = to_bgra(img)
+
+    if face is None:
+        detection = detect_faces(img)
+        if detection['face'] is None:
+            raise NoFaceDetectedError(detection)
+        face = tuple(detection['face'])
+
+    x, y, w, h = face
+    dx, dy = center_offset(img.shape, face)
+
+    # Translate the image to center the face
+    height, width = img.shape[:2]
+    centered_img = extract_roi(img, -dx, -dy, width - dx, height - dy)
+
+    # The translation is an integer shift, so the face box moves with it and needs no second detection
+    return centered_img, (x + dx, y + dy, w, h)
+
+def resize_and_center_head(image, head_to_face_ratio=1.5, face=None):
+    # Ensure the image has an alpha channel for transparency
+    image = to_bgra(image)
+
+    if face is None:
+        detection = detect_faces(image, 1.1, 4)
+        if detection['face'] is None:
+            raise NoFaceDetectedError(detection)
+        face = tuple(detection['face'])
+
+    start_x, start_y, end_x, end_y = crop_window(image.shape, face, head_to_face_ratio)
+
     # Crop the original image based on the calculated window
-    cropped_img = image[start_y:end_y, start_x:end_x]
+    return image[start_y:end_y, start_x:end_x]
+
+def subject_bounds(img, threshold=0):
+    # Tight box around the opaque pixels of the carvekit cut-out, from one row and one column reduction
+    mask = img[:, :, 3] > threshold
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if rows.size == 0:
+        return None
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+def trim_window(window, bounds):
+    start_x, start_y, end_x, end_y = window
+
+    # Drop the transparent margins beside and below the subject. The top edge stays where crop_window
+    # put it, the clear space above the hair is the headroom a passport photo needs.
+    trimmed_x0, trimmed_y0 = max(start_x, bounds[0]), start_y
+    trimmed_x1, trimmed_y1 = min(end_x, bounds[2]), min(end_y, bounds[3])
+    if trimmed_x0 >= trimmed_x1 or trimmed_y0 >= trimmed_y1:
+        return window
+    return trimmed_x0, trimmed_y0, trimmed_x1, trimmed_y1
+
+def grow_to_aspect(window, size):
+    # Grows the window to the aspect ratio of size (width, height), keeping the headroom and the
+    # horizontal center. Padding happens in whole steps of the reduced ratio, so the result scales
+    # to exactly size without distortion.
+    start_x, start_y, end_x, end_y = window
+    divisor = math.gcd(*size)
+    step_x, step_y = size[0] // divisor, size[1] // divisor
+
+    steps = max(-(-(end_x - start_x) // step_x), -(-(end_y - start_y) // step_y), 1)
+    width, height = steps * step_x, steps * step_y
+    start_x -= (width - (end_x - start_x)) // 2
+    return start_x, start_y, start_x + width, start_y + height
+
+def crop_centered_head(img, face, head_to_face_ratio=1.5, auto_trim=True):
+    # Equivalent to detect_and_center_head followed by resize_and_center_head, but the crop window
+    # is mapped back to the source image, so the full frame is never translated or copied
+    img = to_bgra(img)
+    x, y, w, h = face
+    dx, dy = center_offset(img.shape, face)
+
+    start_x, start_y, end_x, end_y = crop_window(img.shape, (x + dx, y + dy, w, h), head_to_face_ratio)
+    window = (start_x - dx, start_y - dy, end_x - dx, end_y - dy)
+
+    if auto_trim:
+        bounds = subject_bounds(img)
+        if bounds is not None:
+            window = trim_window(window, bounds)
+        window = grow_to_aspect(window, PASSPORT_SIZE)
+
+    return extract_roi(img, *window)
+
+def resize_to_fit(image, max_width, max_height):
+    # Same geometry as `mogrify -resize WxH`: keep the aspect ratio and fit inside the box
+    height, width = image.shape[:2]
+    scale = min(max_width / width, max_height / height)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    if size == (width, height):
+        return image
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    return cv2.resize(image, size, interpolation=interpolation)
+
+def resize_exact(image, size):
+    height, width = image.shape[:2]
+    if (width, height) == tuple(size):
+        return image
+    interpolation = cv2.INTER_AREA if width > size[0] else cv2.INTER_CUBIC
+    return cv2.resize(image, tuple(size), interpolation=interpolation)
+
+def encode_png(image):
+    success, buffer = cv2.imencode('.png', image)
+    if not success:
+        raise ValueError("Could not encode the image as PNG.")
+    return buffer.tobytes()
+
+def encode_jpeg(image, quality):
+    success, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality, cv2.IMWRITE_JPEG_OPTIMIZE, 1])
+    if not success:
+        raise ValueError("Could not encode the image as JPEG.")
+    return buffer.tobytes()
+
+def has_transparency(image):
+    return image.shape[2] == 4 and bool((image[:, :, 3] < 255).any())
+
+def flatten_onto(image, background):
+    # Composites a BGRA image onto a solid (B, G, R) background, the result has no alpha channel
+    if image.shape[2] == 3:
+        return image
+    alpha = image[:, :, 3:4].astype(np.float32) / 255
+    flat = image[:, :, :3] * alpha + np.array(background, np.float32) * (1 - alpha)
+    return np.rint(flat).astype(np.uint8)
+
+def decode_png(data):
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+
+def load_cutout(source, digest=None):
+    # Background removal is by far the slowest stage, so its result is kept per input image
+    cache = get_cache()
+    data = None
+    if cache is not None:
+        key = cache.key(digest or source_digest(source), background_remover_signature())
+        data = cache.get('cutout', key)
+
+    if data is not None:
+        with stage('cutout_cache'):
+            img = decode_png(data)
+    else:
+        with stage('background_removal'):
+            img = remove_background(source)
+        if cache is not None:
+            with stage('cutout_cache'):
+                cache.put('cutout', key, encode_png(img))
+
+    record(input={'width': img.shape[1], 'height': img.shape[0]})
+    return img
+
+def load_detection(img, digest=None):
+    cache = get_cache()
+    detection = None
+    if cache is not None and digest is not None:
+        key = cache.key(digest, background_remover_signature(), DETECTION_MAX_SIZE)
+        data = cache.get('detection', key)
+        if data is not None:
+            detection = json.loads(data)
+
+    if detection is None:
+        with stage('face_detection'):
+            detection = detect_faces(img)
+        if cache is not None and digest is not None:
+            cache.put('detection', key, json.dumps(detection).encode())
+
+    record(face_count=detection['face_count'], confidence=detection['confidence'])
+    return detection
+
+def analyze_photo(source, digest=None):
+    # Background removal and face detection, failing right after detection when there is no face
+    img = load_cutout(source, digest)
+
+    detection = load_detection(img, digest)
+    if detection['face'] is None:
+        raise NoFaceDetectedError(detection)
+
+    return img, tuple(detection['face'])
+
+def make_passport_photo(source, head_to_face_ratio=1.5, digest=None):
+    # The source is an image path or the encoded image bytes
+    if digest is None and get_cache() is not None:
+        with stage('digest'):
+            digest = source_digest(source)
+
+    # Everything between reading the upload and writing the result stays in memory
+    img, face = analyze_photo(source, digest)
+
+    with stage('crop'):
+        cropped_img = crop_centered_head(img, face, head_to_face_ratio)
+
+    # The window has exactly the passport aspect ratio, so this scales without distorting
+    with stage('resize'):
+        return resize_exact(cropped_img, PASSPORT_SIZE)
+
+def passport_photo_png(source, head_to_face_ratio=1.5, digest=None):
+    # Returns the passport photo both as an array and PNG encoded
+    cache = get_cache()
+    if cache is not None:
+        if digest is None:
+            with stage('digest'):
+                digest = source_digest(source)
+        key = cache.key(digest, background_remover_signature(), head_to_face_ratio, DETECTION_MAX_SIZE, PASSPORT_SIZE)
+        data = cache.get('passport', key)
+        if data is not None:
+            with stage('passport_cache'):
+                return decode_png(data), data
+
+    passport_photo = make_passport_photo(source, head_to_face_ratio, digest)
+
+    # PNG preserves the transparency
+    with stage('encode_png'):
+        data = encode_png(passport_photo)
+    if cache is not None:
+        cache.put('passport', key, data)
+
+    return passport_photo, data
+
+def create_passport_photo(source, output_path, head_to_face_ratio=1.5, digest=None):
+    passport_photo, data = passport_photo_png(source, head_to_face_ratio, digest)
+
+    with open(output_path, 'wb') as file:
+        file.write(data)
+
+    return passport_photo
+
+def preview_passport_crops(source, ratios):
+    # Background removal and face detection run once, only the (cheap) crop is repeated per ratio
+    digest = source_digest(source) if get_cache() is not None else None
+    img, face = analyze_photo(source, digest)
+
+    with stage('crop'):
+        return [(ratio, crop_centered_head(img, face, ratio)) for ratio in ratios]
+
+def make_contact_sheet(crops, cell_height=420, columns=6):
+    cell_width = int(cell_height * 1.021 / 1.43)
+    label_height = 40
+    rows = (len(crops) + columns - 1) // columns
+    sheet = np.zeros((rows * (cell_height + label_height), min(columns, len(crops)) * cell_width, 4), dtype=np.uint8)
+
+    for index, (ratio, crop) in enumerate(crops):
+        top = (index // columns) * (cell_height + label_height)
+        left = (index % columns) * cell_width
 
-    # Save the processed image
-    cv2.imwrite(output_path, cropped_img)
+        thumbnail = resize_to_fit(crop, cell_width, cell_height)
+        height, width = thumbnail.shape[:2]
+        y = top + (cell_height - height) // 2
+        x = left + (cell_width - width) // 2
+        sheet[y:y + height, x:x + width] = thumbnail
 
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='Crop the image based on head position and size.')
-    parser.add_argument('-i', '--input', required=True, help='Path to input image')
-    parser.add_argument('-o', '--output', required=True, help='Path to save processed image')
-    parser.add_argument('-r', '--head_to_face_ratio', type=float, default=1.5, required=False, help='Ratio of Head Size to the Face Size')
-    args = parser.parse_args()
+        sheet[top + cell_height:top + cell_height + label_height, left:left + cell_width] = (255, 255, 255, 255)
+        cv2.putText(sheet, f"{ratio:g}", (left + 10, top + cell_height + 30), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 0, 255), 2)
 
-    temp_png_file_0 = tempfile.mktemp(suffix='.png')
-    temp_png_file_1 = tempfile.mktemp(suffix='.png')
+    return sheet
 
-    subprocess.run(["carvekit", "-i", args.input, "-o", f"{temp_png_file_0}"], check=True)
+def preview_sheet_png(source, ratios):
+    crops = preview_passport_crops(source, ratios)
 
-    detect_and_center_head(temp_png_file_0, temp_png_file_1)
+    with stage('contact_sheet'):
+        return encode_png(make_contact_sheet(crops))
 
-    resize_and_center_head(temp_png_file_1, args.output, args.head_to_face_ratio)
+def create_preview_sheet(source, output_path, ratios):
+    data = preview_sheet_png(source, ratios)
+
+    with open(output_path, 'wb') as file:
+        file.write(data)
+
+    return data
+
+if __name__ == '__main__':
+    # The CLI lives in id_card_cli, which only loads this module when no worker answers
+    from id_card_cli import passport_photo_main
 
-    os.remove(temp_png_file_0)
-    os.remove(temp_png_file_1)
+    passport_photo_main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for the photo pipeline.
+
+Entries are keyed by the SHA-256 of the uploaded image plus the parameters of the stage that
+produced them, so a retried job or a card regenerated with a new name or color only re-runs the
+stages whose inputs actually changed. Every key also holds CACHE_VERSION, so entries written by an
+older pipeline are never served after a deploy. The least recently used entries are evicted once
+the cache grows past its size budget.
+
+Configuration:
+    ID_CARD_CACHE_DIR   where entries are stored (defaults to <tmp>/id-card-cache-<uid>), it must be
+                        owned by the user running the tools
+    ID_CARD_CACHE_SIZE  size budget in bytes (defaults to 1 GiB, 0 disables the cache)
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), f'id-card-cache-{os.getuid()}')
+DEFAULT_CACHE_SIZE = 1024 * 1024 * 1024
+
+# Bump whenever a change to the pipeline changes what a stage produces (crop geometry, encoding,
+# rendering...), which invalidates every entry written before it
+CACHE_VERSION = 2
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def source_digest(source):
+    # Sources are either a path or the encoded image bytes (e.g. read from stdin)
+    if isinstance(source, bytes):
+        return hashlib.sha256(source).hexdigest()
+    return file_digest(source)
+
+class PhotoCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+        # Entries are served as they are, so a directory someone else can write to is not trusted
+        stat = os.stat(directory)
+        if stat.st_uid != os.getuid() or stat.st_mode & 0o022:
+            raise PermissionError(f"Cache directory {directory} must be owned by and only writable by uid {os.getuid()}.")
+
+    def key(self, *parts):
+        return hashlib.sha256(json.dumps([CACHE_VERSION, *parts], sort_keys=True, default=str).encode()).hexdigest()
+
+    def path(self, stage, key):
+        return os.path.join(self.directory, f"{stage}-{key}")
+
+    def get(self, stage, key):
+        path = self.path(stage, key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+
+        # The modification time doubles as the last access time for LRU eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return data
+
+    def put(self, stage, key, data):
+        # Write to a temp file first so concurrent readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, self.path(stage, key))
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.startswith('.tmp-') or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+def get_cache():
+    # None when the cache is disabled
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            max_bytes = int(os.environ.get('ID_CARD_CACHE_SIZE', DEFAULT_CACHE_SIZE))
+            if max_bytes <= 0:
+                return None
+            _cache = PhotoCache(os.environ.get('ID_CARD_CACHE_DIR', DEFAULT_CACHE_DIR), max_bytes)
+        return _cache